@@ -0,0 +1,143 @@
+""" Vectorized NumPy evaluation of candidate actions.
+
+Turns the legal (worker, move, build) actions of one or many positions into
+arrays and scores them in one pass with the heuristic player's formula
+(c1*height + c2*center + c3*distance, infinity for a winning climb), giving
+the same numbers as Santorini.heuristic_scores. current_scores is the batched
+version of Santorini.current_score.
+
+Positions are described by three arrays:
+    heights  (P, 25) cell heights
+    workers  (P, 4) cells of workers A, B, Y, Z
+    colors   (P,) side to move, 0 for white and 1 for blue
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from engine import CELLS, DISTANCE, MIDDLE_CELL, POSITIONS, STEPS, WEIGHTS
+
+# cell CELLS is an off-board sentinel: it is never free and never reachable
+OFF_BOARD = CELLS
+
+
+def _step_table():
+    table = np.full((CELLS + 1, len(STEPS)), OFF_BOARD, dtype = np.int64)
+    for cell in range(CELLS):
+        row, col = POSITIONS[cell]
+        for direction, step in enumerate(STEPS):
+            r, c = row + step[0], col + step[1]
+            if 0 <= r < 5 and 0 <= c < 5:
+                table[cell, direction] = r * 5 + c
+    return table
+
+# STEP[cell, direction] is the neighbor in STEPS order, the same order as NEIGHBORS
+STEP = _step_table()
+DIST = np.zeros((CELLS + 1, CELLS + 1), dtype = np.int64)
+DIST[:CELLS, :CELLS] = DISTANCE
+
+ActionBatch = namedtuple("ActionBatch", ["position", "worker", "start", "end", "build", "score"])
+
+
+def encode(states, colors):
+    """ Arrays for a list of GameStates and the color to move in each. """
+    heights = np.array([[state.height(cell) for cell in range(CELLS)] for state in states], dtype = np.int64)
+    workers = np.array([state.workers for state in states], dtype = np.int64)
+    return heights, workers, np.asarray(colors, dtype = np.int64)
+
+
+def _padded(heights, workers):
+    """ Heights and occupancy with the off-board column added. """
+    n = heights.shape[0]
+    rows = np.arange(n)[:, None]
+    padded = np.empty((n, CELLS + 1), dtype = np.int64)
+    padded[:, :CELLS] = heights
+    padded[:, OFF_BOARD] = 5
+    occupied = np.zeros((n, CELLS + 1), dtype = bool)
+    occupied[rows, workers] = True
+    occupied[:, OFF_BOARD] = True
+    return padded, occupied
+
+
+def _sides(workers, colors):
+    """ (P, 2) cells of the side to move's workers and of its opponent's. """
+    rows = np.arange(workers.shape[0])[:, None]
+    mine = workers[rows, 2 * colors[:, None] + np.array([0, 1])]
+    theirs = workers[rows, 2 - 2 * colors[:, None] + np.array([0, 1])]
+    return mine, theirs
+
+
+def move_scores(heights, workers, colors, weights = WEIGHTS):
+    """ Scores every (position, worker, direction) move.
+        Return:
+            (tuple) : scores (P, 2, 8) float, legal (P, 2, 8) bool and the
+            target cells (P, 2, 8).
+    """
+    c1, c2, c3 = weights
+    padded, occupied = _padded(heights, workers)
+    mine, theirs = _sides(workers, colors)
+    rows = np.arange(heights.shape[0])[:, None, None]
+
+    start_height = padded[rows[:, :, 0], mine]
+    target = STEP[mine]
+    target_height = padded[rows, target]
+    legal = ~occupied[rows, target] & (target_height <= start_height[:, :, None] + 1)
+
+    # the other worker stays put: slot 0 moves with slot 1 static and vice versa
+    static = mine[:, ::-1][:, :, None]
+    opponent1 = theirs[:, 0][:, None, None]
+    opponent2 = theirs[:, 1][:, None, None]
+    height_score = target_height + padded[rows, static]
+    center_score = (2 - DIST[target, MIDDLE_CELL]) + (2 - DIST[static, MIDDLE_CELL])
+    moving_distance_score = np.minimum(DIST[target, opponent1], DIST[static, opponent1])
+    static_distance_score = DIST[static, opponent2]
+    distance_score = 8 - (moving_distance_score + static_distance_score)
+
+    scores = (c1 * height_score + c2 * center_score + c3 * distance_score).astype(np.float64)
+    scores[target_height == 3] = np.inf
+    return scores, legal, target
+
+
+def evaluate_actions(heights, workers, colors, weights = WEIGHTS):
+    """ Every legal (worker, move, build) action of every position with its score,
+        ordered by position and then as search.actions orders them.
+        Return:
+            (ActionBatch) : Flat arrays, one entry per action; worker is 0-3.
+    """
+    scores, legal, target = move_scores(heights, workers, colors, weights)
+    padded, occupied = _padded(heights, workers)
+    mine, _ = _sides(workers, colors)
+    buildable = ~occupied & (padded < 4)
+
+    # builds are only generated for the legal moves
+    position, slot, direction = np.nonzero(legal)
+    start = mine[position, slot]
+    end = target[position, slot, direction]
+    build = STEP[end]
+    # after the move the start cell is free and the end cell is taken
+    can_build = buildable[position[:, None], build] | (build == start[:, None])
+
+    move, build_direction = np.nonzero(can_build)
+    position = position[move]
+    return ActionBatch(
+        position = position,
+        worker = 2 * colors[position] + slot[move],
+        start = start[move],
+        end = end[move],
+        build = build[move, build_direction],
+        score = scores[position, slot[move], direction[move]],
+    )
+
+
+def current_scores(heights, workers, colors):
+    """ (height, center, distance) of the side to move in each position, as
+        Santorini.current_score computes them.
+    """
+    rows = np.arange(heights.shape[0])[:, None]
+    mine, theirs = _sides(workers, colors)
+    height = heights[rows, mine].sum(axis = 1)
+    center_score = (2 - DIST[mine, MIDDLE_CELL]).sum(axis = 1)
+    moving_distance_score = DIST[mine, theirs[:, 0:1]].min(axis = 1)
+    static_distance_score = DIST[mine, theirs[:, 1:2]].min(axis = 1)
+    distance_score = 8 - (moving_distance_score + static_distance_score)
+    return np.stack([height, center_score, distance_score], axis = 1)
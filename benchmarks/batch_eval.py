@@ -0,0 +1,95 @@
+""" Speed of the NumPy batch evaluator against the Python scoring loop.
+
+Scores the legal moves of P random positions with Santorini.heuristic_scores
+one position at a time and with batch_eval.move_scores in one call, for each
+batch size, and checks that both give the same scores. The time to expand
+every (worker, move, build) action with evaluate_actions and to encode the
+positions as arrays is reported as well. speedup counts encoding, so it is
+the gain when starting from GameStates; scoring_speedup leaves it out, the
+gain when the positions are already arrays (a loaded dataset, say).
+
+    python3 -m benchmarks.batch_eval --sizes 1 10 100 1000 10000 100000
+"""
+import json
+import time
+import argparse
+
+import numpy as np
+
+import batch_eval
+from engine import WORKERS
+from main import Santorini, WhitePlayer, BluePlayer
+from benchmarks.positions import random_positions
+
+# the Python loop is timed on at most this many positions and scaled up
+PYTHON_LIMIT = 10000
+
+
+def games_for(positions):
+    games = []
+    for state, color in positions:
+        game = Santorini(WhitePlayer("heuristic", "off"), BluePlayer("heuristic", "off"), undo_redo = "off", score_display = "off", render = "none")
+        game.set_up_board(state)
+        games.append((game, color))
+    return games
+
+
+def python_scores(games):
+    scores = []
+    for game, color in games:
+        player, opponent = (game.white, game.blue) if color == 0 else (game.blue, game.white)
+        scores.append(game.heuristic_scores(player, opponent))
+    return scores
+
+
+def check(games, heights, workers, colors):
+    """ Compares move scores position by position; raises on the first mismatch. """
+    scores, legal, target = batch_eval.move_scores(heights, workers, colors)
+    for index, moves in enumerate(python_scores(games)):
+        slot, direction = np.nonzero(legal[index])
+        vectorized = [(WORKERS[2 * colors[index] + s], int(target[index, s, d]), float(scores[index, s, d])) for s, d in zip(slot, direction)]
+        expected = [(move[0], move[2][0] * 5 + move[2][1], float(move[3])) for move in moves]
+        if vectorized != expected:
+            raise AssertionError(f"position {index}: {vectorized} != {expected}")
+
+
+def measure(size, positions):
+    games = games_for(positions[:min(size, PYTHON_LIMIT)])
+    start = time.perf_counter()
+    python_scores(games)
+    python_seconds = (time.perf_counter() - start) * size / len(games)
+
+    start = time.perf_counter()
+    heights, workers, colors = batch_eval.encode([state for state, _ in positions[:size]], [color for _, color in positions[:size]])
+    encode_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch_eval.move_scores(heights, workers, colors)
+    numpy_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = batch_eval.evaluate_actions(heights, workers, colors)
+    actions_seconds = time.perf_counter() - start
+
+    check(games[:1000], heights[:1000], workers[:1000], colors[:1000])
+    return {
+        "positions": size,
+        "actions": int(batch.score.shape[0]),
+        "python_seconds": python_seconds,
+        "numpy_seconds": numpy_seconds,
+        "speedup": python_seconds / (encode_seconds + numpy_seconds) if encode_seconds + numpy_seconds > 0 else None,
+        "scoring_speedup": python_seconds / numpy_seconds if numpy_seconds > 0 else None,
+        # full (worker, move, build) enumeration and the cost of building the arrays
+        "numpy_actions_seconds": actions_seconds,
+        "encode_seconds": encode_seconds,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Compare NumPy batch evaluation with the Python loop', prog = 'benchmarks.batch_eval')
+    parser.add_argument('--sizes', type = int, nargs = '+', default = [1, 10, 100, 1000, 10000, 100000], help='batch sizes in positions')
+    parser.add_argument('--seed', type = int, default = 0, help='seed for the random positions')
+    args = parser.parse_args()
+
+    positions = random_positions(max(args.sizes), args.seed)
+    print(json.dumps([measure(size, positions) for size in args.sizes], indent = 2))
@@ -0,0 +1,120 @@
+""" Memory and time cost of undo/redo history: deepcopy snapshots vs the move log.
+
+A single Santorini game cannot reach 200 plies (every ply builds and the board
+only holds 100 levels), so the 200 plies are played as back-to-back seeded
+random games whose history is kept in one growing list, which is what a long
+session with undo on looks like.
+
+    python3 -m benchmarks.history --plies 200 --seed 0
+"""
+import json
+import time
+import random
+import argparse
+import tracemalloc
+from copy import deepcopy
+
+from main import Santorini, WhitePlayer, BluePlayer
+
+
+def new_game(rng):
+    white = WhitePlayer("random", score_display = "off")
+    blue = BluePlayer("random", score_display = "off")
+    game = Santorini(white, blue, undo_redo = "off", score_display = "off", render = "none", rng = rng)
+    game.set_up_board()
+    return game
+
+
+def play_plies(n_plies, seed):
+    """ Yields the game after each of n_plies random plies, starting a new game
+        whenever one ends.
+    """
+    rng = random.Random(seed)
+    game = new_game(rng)
+    played = 0
+    while played < n_plies:
+        if game.turn_num % 2 == 1:
+            over = game.take_turn(game.white, game.blue)
+        else:
+            over = game.take_turn(game.blue, game.white)
+        if over == "over":
+            game = new_game(rng)
+            continue
+        played += 1
+        yield game
+
+
+def snapshot(game):
+    return deepcopy(game)
+
+
+def move_record(game):
+    return game.last_move
+
+
+def measure(keep, n_plies, seed):
+    """ Keeps history with keep(game) after every ply and reports its cost.
+        Memory and time come from separate runs since tracemalloc slows
+        allocation down.
+    """
+    history = []
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for game in play_plies(n_plies, seed):
+        history.append(keep(game))
+    # everything still traced apart from the current game is the history
+    memory = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    history = []
+    keep_seconds = 0.0
+    for game in play_plies(n_plies, seed):
+        start = time.perf_counter()
+        history.append(keep(game))
+        keep_seconds += time.perf_counter() - start
+    return {
+        "plies": len(history),
+        "history_bytes": memory,
+        "bytes_per_ply": memory / len(history),
+        "keep_us_per_ply": keep_seconds / len(history) * 1e6,
+    }
+
+
+def measure_undo(n_plies, seed):
+    """ Time per ply to undo back through the whole history with each scheme. """
+    snapshots = []
+    logs = []
+    for game in play_plies(n_plies, seed):
+        snapshots.append(deepcopy(game))
+        if not logs or logs[-1][0] is not game:
+            logs.append((game, []))
+        logs[-1][1].append(game.last_move)
+
+    start = time.perf_counter()
+    for game in reversed(snapshots):
+        deepcopy(game)
+    snapshot_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for game, moves in reversed(logs):
+        for move in reversed(moves):
+            game.unmake_move(move)
+    log_seconds = time.perf_counter() - start
+    return {
+        "deepcopy_undo_us_per_ply": snapshot_seconds / len(snapshots) * 1e6,
+        "move_log_undo_us_per_ply": log_seconds / len(snapshots) * 1e6,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Compare deepcopy history with the move log', prog = 'benchmarks.history')
+    parser.add_argument('--plies', type = int, default = 200, help='plies of history to keep')
+    parser.add_argument('--seed', type = int, default = 0, help='seed for the random games')
+    args = parser.parse_args()
+
+    report = {
+        "deepcopy": measure(snapshot, args.plies, args.seed),
+        "move_log": measure(move_record, args.plies, args.seed),
+    }
+    report.update(measure_undo(args.plies, args.seed))
+    print(json.dumps(report, indent = 2))
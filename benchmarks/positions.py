@@ -0,0 +1,26 @@
+""" Reproducible sample positions for the benchmarks. """
+import random
+
+from engine import GameState
+
+
+def random_positions(n, seed):
+    """ (state, color to move) pairs taken from every ply of seeded random games. """
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < n:
+        state = GameState.start()
+        color = 0
+        # replay a random game one ply at a time, keeping each position
+        while len(positions) < n:
+            positions.append((state.clone(), color))
+            moves = [(index, cell) for index in (2 * color, 2 * color + 1) for cell in state.moves(index)]
+            if not moves:
+                break
+            index, cell = rng.choice(moves)
+            if state.height(cell) == 3:
+                break
+            state.move(index, cell)
+            state.build(rng.choice(state.builds(index)))
+            color = 1 - color
+    return positions
@@ -0,0 +1,143 @@
+""" Load test for the game server.
+
+Opens --idle connections that each start a game against a computer player and
+then wait, and --active connections that play whole games as a random human
+player, all at once. Reports the time per human move the server took to
+answer, games/sec, and (when the server runs in this process, the default)
+the memory each idle game holds, counting both ends of its connection.
+
+    python3 -m benchmarks.server_load --idle 5000 --active 50 --games 4
+    python3 -m benchmarks.server_load --port 4000 --active 200     (a running server)
+"""
+import json
+import time
+import random
+import asyncio
+import argparse
+import tracemalloc
+
+from engine import GameState, WORKER_INDEX, DIRECTION_CELLS, Move, legal_actions
+from server import GameServer, format_move
+
+COLORS = {"white": 0, "blue": 1}
+
+
+def parse_event(words, state):
+    """ Plays a "move <color> <worker> <direction> <build>" event on state. """
+    index = WORKER_INDEX[words[2]]
+    start = state.workers[index]
+    end = DIRECTION_CELLS[start][words[3]]
+    state.make(Move(index, start, end, DIRECTION_CELLS[end][words[4]]))
+
+
+async def connect(host, port):
+    reader, writer = await asyncio.open_connection(host, port, limit = 1 << 16)
+    await reader.readline()
+    return reader, writer
+
+
+async def idle_game(host, port, opponent, connections):
+    reader, writer = await connect(host, port)
+    writer.write(f"new human {opponent}\n".encode())
+    await writer.drain()
+    while not (await reader.readline()).startswith(b"turn"):
+        pass
+    connections.append(writer)
+
+
+async def active_games(host, port, opponent, n_games, seed, latencies):
+    rng = random.Random(seed)
+    reader, writer = await connect(host, port)
+    finished = 0
+    for _ in range(n_games):
+        state = GameState.start()
+        writer.write(f"new human {opponent}\n".encode())
+        sent = None
+        while True:
+            await writer.drain()
+            words = (await reader.readline()).decode().split()
+            if not words:
+                raise ConnectionError("server closed the connection")
+            if words[0] == "move":
+                parse_event(words, state)
+            elif words[0] == "turn":
+                if sent is not None:
+                    latencies.append(time.perf_counter() - sent)
+                move = rng.choice(list(legal_actions(state, COLORS[words[1]])))
+                writer.write(f"move {format_move(move)}\n".encode())
+                sent = time.perf_counter()
+            elif words[0] == "over":
+                finished += 1
+                break
+            elif words[0] == "error":
+                raise RuntimeError(" ".join(words))
+    writer.write(b"quit\n")
+    writer.close()
+    return finished
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+async def load_test(args):
+    game_server = server = None
+    host, port = args.host, args.port
+    if port is None:
+        tracemalloc.start()
+        game_server = GameServer(args.workers, {"search_depth": 2, "search_time": None, "mcts_playouts": 200})
+        server = await game_server.start(host, 0)
+        port = server.sockets[0].getsockname()[1]
+
+    report = {"idle_games": args.idle, "active_connections": args.active}
+    before = tracemalloc.get_traced_memory()[0] if game_server else None
+    start = time.perf_counter()
+    connections = []
+    # open idle games in batches so the listen backlog is not overrun
+    for batch in range(0, args.idle, 200):
+        await asyncio.gather(*[idle_game(host, port, args.opponent, connections) for _ in range(min(200, args.idle - batch))])
+    report["idle_open_seconds"] = time.perf_counter() - start
+    if game_server is not None:
+        await asyncio.sleep(0.1)
+        report["bytes_per_idle_game"] = (tracemalloc.get_traced_memory()[0] - before) / args.idle if args.idle else None
+
+    latencies = []
+    start = time.perf_counter()
+    finished = await asyncio.gather(*[active_games(host, port, args.opponent, args.games, args.seed + index, latencies) for index in range(args.active)])
+    elapsed = time.perf_counter() - start
+    report.update({
+        "games": sum(finished),
+        "seconds": elapsed,
+        "games_per_sec": sum(finished) / elapsed if elapsed > 0 else None,
+        "human_moves": len(latencies),
+        "reply_ms_median": 1000 * percentile(latencies, 0.5) if latencies else None,
+        "reply_ms_p99": 1000 * percentile(latencies, 0.99) if latencies else None,
+    })
+
+    for writer in connections:
+        writer.close()
+    if server is not None:
+        # let the sessions see their connections close before the loop stops
+        while game_server.sessions:
+            await asyncio.sleep(0.01)
+        server.close()
+        game_server.close()
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Load test the Santorini game server', prog = 'benchmarks.server_load')
+    parser.add_argument('--host', type = str, default = '127.0.0.1', help='server address')
+    parser.add_argument('--port', type = int, default = None, help='port of a running server (default: start one in this process)')
+    parser.add_argument('--idle', type = int, default = 1000, help='games opened and left waiting for a human move')
+    parser.add_argument('--active', type = int, default = 20, help='connections playing games as a random human')
+    parser.add_argument('--games', type = int, default = 5, help='games per active connection')
+    parser.add_argument('--opponent', type = str, default = 'heuristic', help='computer player type the human plays against')
+    parser.add_argument('--workers', type = int, default = 1, help='pool processes for an in-process server')
+    parser.add_argument('--seed', type = int, default = 0, help='seed for the human moves')
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(load_test(args)), indent = 2))
@@ -0,0 +1,134 @@
+""" Benchmark suite for move generation, evaluation, history and whole games.
+
+Every section uses fixed seeds and prints one JSON document, so runs on
+different commits can be compared directly:
+
+    python3 -m benchmarks.suite --out bench.json
+    python3 -m benchmarks.suite --sections perft games --perft-depth 4
+"""
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+
+from engine import GameState, legal_actions
+from main import Santorini, WhitePlayer, BluePlayer
+from perft import perft
+from search import evaluate
+from simulate import simulate, summarize
+from benchmarks.history import measure, move_record, snapshot
+from benchmarks.positions import random_positions
+
+SECTIONS = ["perft", "movegen", "evaluation", "history", "games"]
+MATCHUPS = [("random", "random"), ("random", "heuristic"), ("heuristic", "heuristic")]
+
+
+def rate(function, items, repeat):
+    """ Calls function on every item repeat times and returns calls per second. """
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for item in items:
+            function(item)
+    elapsed = time.perf_counter() - start
+    return repeat * len(items) / elapsed
+
+
+def games_at(positions):
+    games = []
+    for state, color in positions:
+        game = Santorini(WhitePlayer("heuristic", "off"), BluePlayer("heuristic", "off"), undo_redo = "off", score_display = "off", render = "none")
+        game.set_up_board(state)
+        player, opponent = (game.white, game.blue) if color == 0 else (game.blue, game.white)
+        games.append((game, player, opponent))
+    return games
+
+
+def bench_perft(args):
+    results = []
+    for depth in range(1, args.perft_depth + 1):
+        start = time.perf_counter()
+        nodes = perft(GameState.start(), 0, depth)
+        elapsed = time.perf_counter() - start
+        results.append({"depth": depth, "nodes": nodes, "seconds": elapsed, "nodes_per_sec": nodes / elapsed if elapsed > 0 else None})
+    return results
+
+
+def bench_movegen(args):
+    positions = random_positions(args.positions, args.seed)
+    games = games_at(positions)
+    return {
+        "valid_move_per_sec": rate(lambda item: item[0].valid_move(item[1], item[1].workers[0]), games, args.repeat),
+        "valid_build_per_sec": rate(lambda item: item[0].valid_move(item[1], item[1].workers[0], build = True), games, args.repeat),
+        "no_possible_moves_per_sec": rate(lambda item: item[0].no_possible_moves(item[1]), games, args.repeat),
+        "legal_actions_positions_per_sec": rate(lambda item: sum(1 for _ in legal_actions(*item)), positions, args.repeat),
+    }
+
+
+def bench_evaluation(args):
+    positions = random_positions(args.positions, args.seed)
+    games = games_at(positions)
+    return {
+        "current_score_per_sec": rate(lambda item: item[0].current_score(item[1], item[2]), games, args.repeat),
+        "heuristic_scores_per_sec": rate(lambda item: item[0].heuristic_scores(item[1], item[2]), games, args.repeat),
+        "search_evaluate_per_sec": rate(lambda item: evaluate(*item), positions, args.repeat),
+    }
+
+
+def bench_history(args):
+    return {
+        "deepcopy": measure(snapshot, args.plies, args.seed),
+        "move_log": measure(move_record, args.plies, args.seed),
+    }
+
+
+def bench_games(args):
+    results = []
+    for white, blue in MATCHUPS:
+        start = time.perf_counter()
+        games = simulate(white, blue, args.games, seed = args.seed, workers = 1)
+        summary = summarize(games, time.perf_counter() - start)
+        results.append(dict(summary, white = white, blue = blue))
+    return results
+
+
+BENCHMARKS = {
+    "perft": bench_perft,
+    "movegen": bench_movegen,
+    "evaluation": bench_evaluation,
+    "history": bench_history,
+    "games": bench_games,
+}
+
+
+def run(args):
+    report = {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "seed": args.seed,
+    }
+    for section in args.sections:
+        random.seed(args.seed)
+        report[section] = BENCHMARKS[section](args)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Run the Santorini benchmark suite', prog = 'benchmarks.suite')
+    parser.add_argument('--sections', nargs = '+', default = SECTIONS, choices = SECTIONS, help='benchmarks to run')
+    parser.add_argument('--seed', type = int, default = 0, help='seed for positions and games')
+    parser.add_argument('--perft-depth', type = int, default = 3, help='deepest perft count from the start position')
+    parser.add_argument('--positions', type = int, default = 1000, help='random positions for the movegen and evaluation benchmarks')
+    parser.add_argument('--repeat', type = int, default = 5, help='passes over the positions')
+    parser.add_argument('--plies', type = int, default = 200, help='plies of history for the history benchmark')
+    parser.add_argument('--games', type = int, default = 200, help='games per matchup')
+    parser.add_argument('--out', type = str, default = None, help='write the JSON report here instead of stdout')
+    args = parser.parse_args()
+
+    report = json.dumps(run(args), indent = 2)
+    if args.out:
+        with open(args.out, "w") as file:
+            file.write(report + "\n")
+    else:
+        print(report)
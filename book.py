@@ -0,0 +1,150 @@
+""" Opening book and endgame tablebase file.
+
+Both are stored in one indexed file of precomputed replies, keyed by the
+Zobrist hash of the position's canonical form (see symmetry.py) with the side
+to move folded in, so the 8 rotations and reflections of a position and swaps
+of a color's workers share one entry. Moves are stored as played in the
+canonical form and mapped back onto the probed position.
+
+The file is a 32-byte header followed by an open addressing table of 2**k
+slots: all key words first, then all data words, each an unsigned 64-bit
+little endian integer. A lookup hashes straight to a slot and walks forward to
+the key or an empty slot, so a probe reads a few words of the memory-mapped
+file whatever its size. The header also holds the c1, c2, c3 weights the
+opening replies were searched with; tablebase results hold for any weights.
+
+Data word layout, low bits first:
+    13 bits  move code (see transposition.encode_move)
+     2 bits  kind (OPENING or TABLEBASE)
+     7 bits  depth searched or solved to
+    42 bits  score + SCORE_OFFSET; for the tablebase, plies until the side to
+             move wins (positive) or loses (negative)
+
+build_book.py writes these files.
+"""
+import mmap
+import struct
+from array import array
+
+from engine import SIDE_KEYS, WEIGHTS, legal_actions
+from symmetry import canonical, inverse_symmetry, map_move
+from transposition import SCORE_OFFSET, decode_move, encode_move
+
+MAGIC = b"SANB"
+VERSION = 2
+# magic, version, slots, weights
+HEADER = struct.Struct("<4sBxxxQiii4x")
+
+OPENING = 1
+TABLEBASE = 2
+KIND_NAMES = {OPENING: "opening", TABLEBASE: "tablebase"}
+
+
+def position_key(state, color):
+    """ Return:
+            (tuple) : The key of state with color to move, the canonical
+            GameState and the symmetry that maps state onto it.
+    """
+    form, symmetry = canonical(state)
+    return form.hash ^ SIDE_KEYS[color], form, symmetry
+
+
+def stored_move(word, state, form, symmetry):
+    """ The Move in state of the data word stored for its canonical form. """
+    return map_move(decode_move(word & 0x1FFF, form), inverse_symmetry(symmetry), state)
+
+
+def pack(move, kind, depth, score):
+    return ((score + SCORE_OFFSET) << 22) | (depth << 15) | (kind << 13) | encode_move(move)
+
+
+def write_book(path, entries, weights = WEIGHTS):
+    """ Writes a book file.
+        Args:
+            path (string): File to create or overwrite.
+            entries (dict): Position key to the data word made by pack.
+            weights (tuple): The weights the opening replies were searched with.
+        Return:
+            (int) : The number of slots in the table.
+    """
+    slots = 1
+    while slots < 2 * len(entries):
+        slots *= 2
+    mask = slots - 1
+    keys = array("Q", bytes(8 * slots))
+    data = array("Q", bytes(8 * slots))
+    for key, word in entries.items():
+        slot = key & mask
+        while data[slot]:
+            slot = (slot + 1) & mask
+        keys[slot] = key
+        data[slot] = word
+    with open(path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, slots, *weights))
+        keys.tofile(file)
+        data.tofile(file)
+    return slots
+
+
+class Book():
+    """ Read-only view of a book file. """
+    def __init__(self, path):
+        with open(path, "rb") as file:
+            self.map = mmap.mmap(file.fileno(), 0, access = mmap.ACCESS_READ)
+        magic, version, slots, *weights = HEADER.unpack_from(self.map)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a book file")
+        if version != VERSION:
+            raise ValueError(f"{path} has book format version {version}, expected {VERSION}")
+        if len(self.map) != HEADER.size + 16 * slots:
+            raise ValueError(f"{path} is truncated")
+        words = memoryview(self.map)[HEADER.size:].cast("Q")
+        self.keys = words[:slots]
+        self.data = words[slots:]
+        self.mask = slots - 1
+        self.weights = tuple(weights)
+
+    def probe(self, state, color):
+        """ Returns (move, kind, depth, score) stored for color to move in
+            state, or None if the position is not in the book.
+        """
+        key, form, symmetry = position_key(state, color)
+        keys, data, mask = self.keys, self.data, self.mask
+        slot = key & mask
+        while data[slot]:
+            if keys[slot] == key:
+                word = data[slot]
+                move = stored_move(word, state, form, symmetry)
+                # a hash collision could name a worker that cannot make this move
+                if move not in legal_actions(state, color):
+                    return None
+                return (move, (word >> 13) & 0x3, (word >> 15) & 0x7F, (word >> 22) - SCORE_OFFSET)
+            slot = (slot + 1) & mask
+        return None
+
+    def __len__(self):
+        return sum(1 for word in self.data if word)
+
+    def counts(self):
+        counts = {name: 0 for name in KIND_NAMES.values()}
+        for word in self.data:
+            if word:
+                counts[KIND_NAMES[(word >> 13) & 0x3]] += 1
+        return counts
+
+
+def describe(entry):
+    move, kind, depth, score = entry
+    if kind == TABLEBASE:
+        return f"book: tablebase {'win' if score > 0 else 'loss'} in {abs(score)} plies"
+    return f"book: opening, search score {score} at depth {depth}"
+
+
+# books are opened once per process and shared by every game in it
+_books = {}
+
+
+def open_book(path):
+    if path not in _books:
+        _books[path] = Book(path)
+    return _books[path]
@@ -0,0 +1,200 @@
+""" Offline builder for the opening book and endgame tablebase (see book.py).
+
+The opening book covers the first plies from the fixed starting layout. For
+each color it follows that color's book reply and every reply of the other
+side, so a player using the book finds every position it can reach in the
+first --plies plies, and stores the reply of a fixed-depth alpha-beta search
+with the --weights of the players that will use it.
+
+The tablebase holds late positions where a worker is on height 2 next to a
+cell of height 2 or 3, so a win may be a few plies away. Positions are taken
+from headless self-play games and solved exactly to --solve-depth plies; the
+ones whose result is proven are stored with the fastest winning or slowest
+losing move.
+
+    python3 build_book.py --out santorini.book --plies 4 --games 500 --workers 4
+"""
+import time
+import argparse
+from multiprocessing import Pool
+
+from book import KIND_NAMES, OPENING, TABLEBASE, pack, position_key, stored_move, write_book
+from engine import GameState, NEIGHBORS, WEIGHTS, legal_actions
+import records
+from main import parse_weights
+from search import Searcher
+from simulate import game_seeds, play_game
+from symmetry import map_move
+
+MATCHUPS = [("random", "random"), ("random", "heuristic"), ("heuristic", "random"), ("heuristic", "heuristic")]
+
+
+def can_climb(state, color):
+    """ Whether a worker of color stands on height 2 next to a free height 3 cell. """
+    levels = state.levels
+    for index in (2 * color, 2 * color + 1):
+        cell = state.workers[index]
+        if levels[1] >> cell & 1 and not levels[2] >> cell & 1 and state.move_mask(index) & levels[2] & ~levels[3]:
+            return True
+    return False
+
+
+def prove(state, color, depth):
+    """ 1 if color to move wins within depth plies, -1 if it loses within
+        depth plies, 0 if neither is forced.
+    """
+    if can_climb(state, color):
+        return 1
+    if not state.can_move(color):
+        return -1
+    if depth <= 1:
+        return 0
+    best = -1
+    for move in list(legal_actions(state, color)):
+        state.make(move)
+        result = -prove(state, 1 - color, depth - 1)
+        state.unmake(move)
+        if result == 1:
+            return 1
+        best = max(best, result)
+    return best
+
+
+def solve(state, color, max_depth):
+    """ Return:
+            (tuple) : (plies, move); plies is positive for a win in that many
+            plies, negative for a loss and 0 (with move None) if the result is
+            not forced within max_depth plies.
+    """
+    moves = list(legal_actions(state, color))
+    if not moves:
+        # no move loses at once, as in prove
+        return -1, None
+    for depth in range(1, max_depth + 1):
+        result = prove(state, color, depth)
+        if result == 0:
+            continue
+        if result == 1:
+            for move in moves:
+                if state.height(move.end) == 3:
+                    return depth, move
+                state.make(move)
+                lost = prove(state, 1 - color, depth - 1) == -1
+                state.unmake(move)
+                if lost:
+                    return depth, move
+        # every move loses; resist longest, the move the opponent needs most plies to punish
+        best, best_move = 0, moves[0]
+        for move in moves:
+            state.make(move)
+            plies, _ = solve(state, 1 - color, depth - 1)
+            state.unmake(move)
+            if plies > best:
+                best, best_move = plies, move
+        return -(best + 1), best_move
+    return 0, None
+
+
+def near_win(state):
+    """ Whether a worker stands on height 2 next to a cell of height 2 or 3. """
+    for cell in state.workers:
+        if state.height(cell) == 2:
+            for other in NEIGHBORS[cell]:
+                if 2 <= state.height(other) <= 3:
+                    return True
+    return False
+
+
+def opening_entries(plies, depth, weights = WEIGHTS):
+    entries = {}
+    searcher = Searcher(time_budget = None, max_depth = depth, weights = weights)
+    for book_color in (0, 1):
+        frontier = [GameState.start()]
+        for ply in range(plies):
+            color = ply % 2
+            next_frontier = []
+            for state in frontier:
+                if color == book_color:
+                    key, form, symmetry = position_key(state, color)
+                    if key not in entries:
+                        move = searcher.best_move(state, color)
+                        entries[key] = pack(map_move(move, symmetry, form), OPENING, depth, searcher.stats["score"])
+                    moves = [stored_move(entries[key], state, form, symmetry)]
+                else:
+                    moves = list(legal_actions(state, color))
+                for move in moves:
+                    if state.height(move.end) == 3:
+                        continue
+                    child = state.clone()
+                    child.make(move)
+                    next_frontier.append(child)
+            frontier = next_frontier
+    return entries
+
+
+def _solve_game(args):
+    white, blue, seed, depth = args
+    result = play_game(white, blue, seed)
+    entries = {}
+    state = GameState.start()
+    for ply, byte in enumerate(result.moves):
+        color = ply % 2
+        if near_win(state):
+            key, form, symmetry = position_key(state, color)
+            if key not in entries:
+                plies, move = solve(state, color, depth)
+                if move is not None:
+                    entries[key] = pack(map_move(move, symmetry, form), TABLEBASE, depth, plies)
+        state.make(records.decode_move(byte, state, color))
+    return entries
+
+
+def tablebase_entries(n_games, depth, seed = 0, workers = 1):
+    jobs = []
+    for white, blue in MATCHUPS:
+        jobs.extend((white, blue, game_seed, depth) for game_seed in game_seeds(seed, n_games))
+    entries = {}
+    if workers <= 1:
+        results = map(_solve_game, jobs)
+    else:
+        pool = Pool(workers)
+        results = pool.imap_unordered(_solve_game, jobs)
+    for game_entries in results:
+        entries.update(game_entries)
+    if workers > 1:
+        pool.close()
+        pool.join()
+    return entries
+
+
+def build(path, plies = 4, depth = 2, n_games = 200, solve_depth = 3, seed = 0, workers = 1, weights = WEIGHTS):
+    """ Builds a book file with openings to plies plies (searched depth plies
+        deep with weights) and a tablebase from n_games self-play games per matchup.
+        Return:
+            (dict) : Entries written per kind.
+    """
+    entries = tablebase_entries(n_games, solve_depth, seed, workers)
+    # an opening entry wins over a tablebase entry for the same position
+    entries.update(opening_entries(plies, depth, weights))
+    write_book(path, entries, weights)
+    counts = {name: 0 for name in KIND_NAMES.values()}
+    for word in entries.values():
+        counts[KIND_NAMES[(word >> 13) & 0x3]] += 1
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Build the opening book and endgame tablebase', prog = 'build_book.py')
+    parser.add_argument('--out', type = str, default = 'santorini.book', help='book file to write')
+    parser.add_argument('--plies', type = int, default = 4, help='plies from the start covered by the opening book')
+    parser.add_argument('--depth', type = int, default = 2, help='search depth for opening moves')
+    parser.add_argument('--games', type = int, default = 200, help='self-play games per matchup to take tablebase positions from')
+    parser.add_argument('--solve-depth', type = int, default = 3, help='plies to solve tablebase positions to')
+    parser.add_argument('--seed', type = int, default = 0, help='master seed for the self-play games')
+    parser.add_argument('--workers', type = int, default = 1, help='processes solving tablebase positions')
+    parser.add_argument('--weights', type = parse_weights, default = WEIGHTS, help='c1,c2,c3 weights the opening moves are searched with, as given to the players')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    counts = build(args.out, args.plies, args.depth, args.games, args.solve_depth, args.seed, args.workers, args.weights)
+    print(f"{counts['opening']} opening and {counts['tablebase']} tablebase positions written to {args.out} in {time.perf_counter() - start:.1f}s")
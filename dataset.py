@@ -0,0 +1,150 @@
+""" Fixed-width position datasets for fitting evaluation weights.
+
+Every position before a move of a self-play game becomes one 48-byte record
+of POSITION_DTYPE, appended to a raw binary file. The files carry no header,
+so any number of training processes can map them read-only and zero-copy with
+
+    numpy.memmap(path, dtype = POSITION_DTYPE, mode = "r")
+
+(load does exactly that). Games come either from a binary record file (see
+records.py) or from fresh self-play split over shards, one output file and
+one process per shard:
+
+    python3 dataset.py export games.rec positions.bin
+    python3 dataset.py generate random heuristic --games 10000 --shards 4 --out data
+"""
+import os
+import argparse
+from multiprocessing import Pool
+
+import numpy as np
+
+from batch_eval import current_scores
+from engine import CELLS, GameState
+from records import GameRecord, decode_move, read_records
+from simulate import AI_PLAYER_TYPES, game_seeds, play_game
+
+POSITION_DTYPE = np.dtype([
+    ("heights", np.uint8, (CELLS,)),
+    # cells of workers A, B, Y, Z
+    ("workers", np.uint8, (4,)),
+    # side to move, 0 white and 1 blue
+    ("side", np.uint8),
+    ("ply", np.uint8),
+    # current_score (height, center, distance) of the side to move, then of its opponent
+    ("features", np.int8, (2, 3)),
+    # +1 if the side to move went on to win, -1 if it lost, 0 if the game is unfinished
+    ("outcome", np.int8),
+    ("padding", np.uint8, (10,)),
+])
+assert POSITION_DTYPE.itemsize == 48
+SHARD_NAME = "positions-{:05d}.bin"
+
+
+def game_positions(record):
+    """ A POSITION_DTYPE array with the position before every ply of a game. """
+    plies = len(record.moves)
+    positions = np.zeros(plies, dtype = POSITION_DTYPE)
+    state = GameState.start()
+    for ply, byte in enumerate(record.moves):
+        side = ply % 2
+        positions["heights"][ply] = [state.height(cell) for cell in range(CELLS)]
+        positions["workers"][ply] = state.workers
+        positions["side"][ply] = side
+        positions["ply"][ply] = min(ply, 255)
+        state.make(decode_move(byte, state, side))
+
+    heights = positions["heights"].astype(np.int64)
+    workers = positions["workers"].astype(np.int64)
+    side = positions["side"].astype(np.int64)
+    positions["features"][:, 0] = current_scores(heights, workers, side)
+    positions["features"][:, 1] = current_scores(heights, workers, 1 - side)
+    if record.winner is not None:
+        winner = 0 if record.winner == "white" else 1
+        positions["outcome"] = np.where(side == winner, 1, -1)
+    return positions
+
+
+def export_records(records, path, append = True):
+    """ Writes the positions of an iterable of GameRecords to path, after what
+        is already there unless append is off.
+        Return:
+            (int) : The number of positions written.
+    """
+    count = 0
+    with open(path, "ab" if append else "wb") as file:
+        for record in records:
+            positions = game_positions(record)
+            positions.tofile(file)
+            count += len(positions)
+    return count
+
+
+def _generate_shard(args):
+    white, blue, seeds, path, ai_options = args
+
+    def records():
+        for seed in seeds:
+            result = play_game(white, blue, seed, ai_options)
+            yield GameRecord(white, blue, seed, result.winner, result.moves)
+
+    return export_records(records(), path, append = False)
+
+
+def generate(white, blue, n_games, out_dir, shards = 1, seed = 0, ai_options = None):
+    """ Plays n_games of self-play and writes their positions to one file per
+        shard in out_dir, each shard in its own process. Game i goes to shard
+        i % shards and is seeded as in simulate, so the games are the same for
+        any number of shards.
+        Return:
+            (list) : The shard paths.
+    """
+    for player_type in (white, blue):
+        if player_type not in AI_PLAYER_TYPES:
+            raise ValueError(f"{player_type} is not a computer player type")
+    os.makedirs(out_dir, exist_ok = True)
+    # a shard with no games would be an empty file
+    shards = max(1, min(shards, n_games))
+    seeds = game_seeds(seed, n_games)
+    jobs = [(white, blue, seeds[shard::shards], os.path.join(out_dir, SHARD_NAME.format(shard)), ai_options) for shard in range(shards)]
+    if shards <= 1:
+        list(map(_generate_shard, jobs))
+    else:
+        with Pool(shards) as pool:
+            pool.map(_generate_shard, jobs)
+    return [job[3] for job in jobs]
+
+
+def load(path):
+    """ Read-only, zero-copy view of a dataset file. """
+    # numpy cannot map an empty file
+    if os.path.getsize(path) == 0:
+        return np.zeros(0, dtype = POSITION_DTYPE)
+    return np.memmap(path, dtype = POSITION_DTYPE, mode = "r")
+
+
+def load_shards(out_dir):
+    return [load(os.path.join(out_dir, name)) for name in sorted(os.listdir(out_dir)) if name.startswith("positions-")]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Export self-play positions for training', prog = 'dataset.py')
+    commands = parser.add_subparsers(dest = 'command', required = True)
+    export_parser = commands.add_parser('export', help='convert a game record file')
+    export_parser.add_argument('records', type = str, help='binary game record file')
+    export_parser.add_argument('out', type = str, help='dataset file to append to')
+    generate_parser = commands.add_parser('generate', help='play self-play games into sharded dataset files')
+    generate_parser.add_argument('white_player_type', type = str, choices = AI_PLAYER_TYPES)
+    generate_parser.add_argument('blue_player_type', type = str, choices = AI_PLAYER_TYPES)
+    generate_parser.add_argument('--games', type = int, default = 1000, help='number of games to play')
+    generate_parser.add_argument('--shards', type = int, default = 1, help='number of output files and processes')
+    generate_parser.add_argument('--seed', type = int, default = 0, help='master seed for the games')
+    generate_parser.add_argument('--out', type = str, default = 'data', help='output directory')
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        count = export_records(read_records(args.records), args.out)
+        print(f"{count} positions written to {args.out}")
+    else:
+        paths = generate(args.white_player_type, args.blue_player_type, args.games, args.out, shards = args.shards, seed = args.seed)
+        print(f"{sum(len(load(path)) for path in paths)} positions written to {len(paths)} shards in {args.out}")
@@ -0,0 +1,263 @@
+""" Bitboard representation of a Santorini position.
+
+The 5x5 board is stored as 25-bit integers, one bit per cell, where cell
+(row, col) is bit row * 5 + col. Heights are kept as four stacked level masks
+and workers as cell indices plus one occupancy mask per color, so move and
+build generation is a handful of bit operations instead of walking Slot objects.
+"""
+
+import random
+from collections import namedtuple
+
+SIZE = 5
+CELLS = SIZE * SIZE
+FULL = (1 << CELLS) - 1
+MIDDLE_CELL = 12
+
+WORKERS = ["A", "B", "Y", "Z"]
+WORKER_INDEX = {worker: index for index, worker in enumerate(WORKERS)}
+WHITE = 0
+BLUE = 1
+
+# same order as the old Slot.boundaryCheck so move lists (and therefore the
+# random choices made from them) come out identical
+STEPS = [(1, 0), (1, 1), (1, -1), (0, -1), (0, 1), (-1, 0), (-1, -1), (-1, 1)]
+
+# worker cells for the fixed starting layout (Y at 1,1, B at 1,3, A at 3,1, Z at 3,3)
+START_CELLS = [16, 8, 6, 18]
+
+
+# one ply: worker index, the cell it left, the cell it moved to and the cell it built on
+Move = namedtuple("Move", ["worker", "start", "end", "build"])
+
+
+def to_cell(position):
+    return position[0] * SIZE + position[1]
+
+POSITIONS = [divmod(cell, SIZE) for cell in range(CELLS)]
+
+
+def _neighbors(cell):
+    row, col = POSITIONS[cell]
+    neighbors = []
+    for step in STEPS:
+        r, c = row + step[0], col + step[1]
+        if 0 <= r < SIZE and 0 <= c < SIZE:
+            neighbors.append(r * SIZE + c)
+    return tuple(neighbors)
+
+NEIGHBORS = [_neighbors(cell) for cell in range(CELLS)]
+NEIGHBOR_MASKS = [sum(1 << n for n in NEIGHBORS[cell]) for cell in range(CELLS)]
+
+# compass names of the steps, as typed by human players
+STEP_NAMES = {(-1, 0): "n", (-1, 1): "ne", (0, 1): "e", (1, 1): "se", (1, 0): "s", (1, -1): "sw", (0, -1): "w", (-1, -1): "nw"}
+
+# DIRECTION_CELLS[cell]["ne"] is the cell one step north-east (missing if off
+# the board) and CELL_DIRECTIONS[cell][other] is the step name back again
+DIRECTION_CELLS = [{STEP_NAMES[(POSITIONS[n][0] - POSITIONS[cell][0], POSITIONS[n][1] - POSITIONS[cell][1])]: n for n in NEIGHBORS[cell]} for cell in range(CELLS)]
+CELL_DIRECTIONS = [{n: name for name, n in DIRECTION_CELLS[cell].items()} for cell in range(CELLS)]
+
+# Chebyshev (king move) distance between two cells
+DISTANCE = [[max(abs(a[0] - b[0]), abs(a[1] - b[1])) for b in POSITIONS] for a in POSITIONS]
+
+# default c1, c2, c3 for the height, center and distance terms of the heuristic score
+WEIGHTS = (3, 2, 1)
+
+
+# Zobrist keys: one per (cell, height) and per (worker, cell), plus one per
+# side to move for callers that hash the turn in. Height 0 has key 0 so an
+# empty board hashes to 0. The fixed seed keeps hashes stable across runs and
+# processes.
+_zobrist = random.Random(0x5A17)
+HEIGHT_KEYS = [[0] + [_zobrist.getrandbits(64) for _ in range(4)] for _ in range(CELLS)]
+WORKER_KEYS = [[_zobrist.getrandbits(64) for _ in range(CELLS)] for _ in WORKERS]
+SIDE_KEYS = [_zobrist.getrandbits(64) for _ in (WHITE, BLUE)]
+# hash change for raising a cell from height k to k + 1
+HEIGHT_STEP_KEYS = [[keys[k] ^ keys[k + 1] for k in range(4)] for keys in HEIGHT_KEYS]
+
+
+def bits(mask, order):
+    """ Returns the cells of order whose bit is set in mask, keeping the order. """
+    return [cell for cell in order if mask >> cell & 1]
+
+
+def legal_actions(state, color):
+    """ Yields every legal Move for color, worker by worker in NEIGHBORS order.
+        Builds are worked out from masks, so the state is never changed and no
+        intermediate lists are built.
+    """
+    occupied = state.occupied
+    levels = state.levels
+    for index in (2 * color, 2 * color + 1):
+        start = state.workers[index]
+        targets = state.move_mask(index)
+        if not targets:
+            continue
+        # once the worker has moved its start cell is free to build on
+        free = ~(occupied ^ (1 << start)) & ~levels[3]
+        for end in NEIGHBORS[start]:
+            if targets >> end & 1:
+                builds = NEIGHBOR_MASKS[end] & free
+                for build in NEIGHBORS[end]:
+                    if builds >> build & 1:
+                        yield Move(index, start, end, build)
+
+
+def _replace(values, index, value):
+    """ values (a tuple) with values[index] set to value. """
+    return values[:index] + (value,) + values[index + 1:]
+
+
+_new_state = object.__new__
+
+
+class GameState():
+    """ Bitboard game state. Every field is an int or a tuple of ints, and
+        updates replace a tuple instead of changing it, so clone shares them
+        with the original and costs a single allocation.
+    """
+    __slots__ = ("levels", "workers", "color_masks", "occupied", "hash")
+
+    def __init__(self):
+        # levels[k] holds the cells whose height is greater than k, so a
+        # cell's height is the number of level masks it appears in
+        self.levels = (0, 0, 0, 0)
+        self.workers = (None, None, None, None)
+        self.color_masks = (0, 0)
+        self.occupied = 0
+        # Zobrist hash of heights and worker cells, kept up to date by every update
+        self.hash = 0
+
+    @classmethod
+    def start(cls):
+        state = cls()
+        for index, cell in enumerate(START_CELLS):
+            state.place(index, cell)
+        return state
+
+    def clone(self):
+        state = _new_state(GameState)
+        state.levels = self.levels
+        state.workers = self.workers
+        state.color_masks = self.color_masks
+        state.occupied = self.occupied
+        state.hash = self.hash
+        return state
+
+    def height(self, cell):
+        levels = self.levels
+        return (levels[0] >> cell & 1) + (levels[1] >> cell & 1) + (levels[2] >> cell & 1) + (levels[3] >> cell & 1)
+
+    def set_height(self, cell, height):
+        self.hash ^= HEIGHT_KEYS[cell][self.height(cell)] ^ HEIGHT_KEYS[cell][height]
+        bit = 1 << cell
+        self.levels = tuple(level | bit if k < height else level & ~bit for k, level in enumerate(self.levels))
+
+    def zobrist(self):
+        """ Hash computed from scratch; always equal to the incremental self.hash. """
+        key = 0
+        for cell in range(CELLS):
+            key ^= HEIGHT_KEYS[cell][self.height(cell)]
+        for index, cell in enumerate(self.workers):
+            if cell is not None:
+                key ^= WORKER_KEYS[index][cell]
+        return key
+
+    def worker_at(self, cell):
+        if not self.occupied >> cell & 1:
+            return None
+        return WORKERS[self.workers.index(cell)]
+
+    def place(self, index, cell):
+        bit = 1 << cell
+        self.workers = _replace(self.workers, index, cell)
+        color = index >> 1
+        self.color_masks = _replace(self.color_masks, color, self.color_masks[color] | bit)
+        self.occupied |= bit
+        self.hash ^= WORKER_KEYS[index][cell]
+
+    def move(self, index, cell):
+        """ Moves worker index to cell without checking the rules. """
+        start = self.workers[index]
+        change = (1 << start) | (1 << cell)
+        self.hash ^= WORKER_KEYS[index][start] ^ WORKER_KEYS[index][cell]
+        workers = self.workers
+        if index == 0:
+            self.workers = (cell, workers[1], workers[2], workers[3])
+        elif index == 1:
+            self.workers = (workers[0], cell, workers[2], workers[3])
+        elif index == 2:
+            self.workers = (workers[0], workers[1], cell, workers[3])
+        else:
+            self.workers = (workers[0], workers[1], workers[2], cell)
+        white, blue = self.color_masks
+        self.color_masks = (white ^ change, blue) if index < 2 else (white, blue ^ change)
+        self.occupied ^= change
+
+    def build(self, cell):
+        """ Raises cell by one level without checking the rules. """
+        bit = 1 << cell
+        level0, level1, level2, level3 = self.levels
+        if not level0 & bit:
+            self.levels = (level0 | bit, level1, level2, level3)
+            self.hash ^= HEIGHT_STEP_KEYS[cell][0]
+        elif not level1 & bit:
+            self.levels = (level0, level1 | bit, level2, level3)
+            self.hash ^= HEIGHT_STEP_KEYS[cell][1]
+        elif not level2 & bit:
+            self.levels = (level0, level1, level2 | bit, level3)
+            self.hash ^= HEIGHT_STEP_KEYS[cell][2]
+        elif not level3 & bit:
+            self.levels = (level0, level1, level2, level3 | bit)
+            self.hash ^= HEIGHT_STEP_KEYS[cell][3]
+
+    def unbuild(self, cell):
+        """ Removes the top level of cell. """
+        bit = 1 << cell
+        level0, level1, level2, level3 = self.levels
+        if level3 & bit:
+            self.levels = (level0, level1, level2, level3 & ~bit)
+            self.hash ^= HEIGHT_STEP_KEYS[cell][3]
+        elif level2 & bit:
+            self.levels = (level0, level1, level2 & ~bit, level3)
+            self.hash ^= HEIGHT_STEP_KEYS[cell][2]
+        elif level1 & bit:
+            self.levels = (level0, level1 & ~bit, level2, level3)
+            self.hash ^= HEIGHT_STEP_KEYS[cell][1]
+        elif level0 & bit:
+            self.levels = (level0 & ~bit, level1, level2, level3)
+            self.hash ^= HEIGHT_STEP_KEYS[cell][0]
+
+    def make(self, move):
+        self.move(move.worker, move.end)
+        self.build(move.build)
+
+    def unmake(self, move):
+        self.unbuild(move.build)
+        self.move(move.worker, move.start)
+
+    def move_mask(self, index):
+        """ Cells worker index can step to: free, on the board and at most one level up. """
+        cell = self.workers[index]
+        mask = NEIGHBOR_MASKS[cell] & ~self.occupied
+        height = self.height(cell)
+        if height < 3:
+            mask &= ~self.levels[height + 1]
+        return mask
+
+    def build_mask(self, index):
+        """ Cells worker index can build on: free, on the board and not domed. """
+        return NEIGHBOR_MASKS[self.workers[index]] & ~self.occupied & ~self.levels[3]
+
+    def moves(self, index):
+        return bits(self.move_mask(index), NEIGHBORS[self.workers[index]])
+
+    def builds(self, index):
+        return bits(self.build_mask(index), NEIGHBORS[self.workers[index]])
+
+    def can_move(self, color):
+        return bool(self.move_mask(2 * color) or self.move_mask(2 * color + 1))
+
+    def has_won(self, color):
+        # a worker can never stand on a dome, so level 3 membership means height 3
+        return bool(self.color_masks[color] & self.levels[2])
@@ -0,0 +1,74 @@
+""" Pluggable position evaluation for the heuristic and search players.
+
+An Evaluator scores the positions reached by a turn's candidate actions in
+one call (score_actions), which lets learned evaluators batch them, and
+single positions for search leaves (evaluate). Scores are ints in the
+search's units, higher is better for the color asked about. Climbs to height
+3 are not special-cased; both players treat them as wins before asking.
+
+    heuristic              the search player's formula, c1*height + c2*center + c3*distance
+    <path>.npz             a model trained by train_evaluator.py (needs NumPy, see learned.py)
+
+main.py and simulate.py take either with --evaluator.
+"""
+from abc import ABC, abstractmethod
+
+from engine import WEIGHTS
+from search import evaluate
+
+
+class Evaluator(ABC):
+    @abstractmethod
+    def score_actions(self, state, color, moves):
+        """ Args:
+                state (GameState): The position before the actions, color to move.
+                color (int): The side playing the actions.
+                moves (list): Legal Moves for color.
+            Return:
+                (list) : The score for color of the position after each move.
+        """
+
+    @abstractmethod
+    def evaluate(self, state, color):
+        """ The score of state for color, which is to move. """
+
+    def describe(self):
+        return type(self).__name__
+
+
+class HeuristicEvaluator(Evaluator):
+    def __init__(self, weights = WEIGHTS):
+        self.weights = weights
+
+    def score_actions(self, state, color, moves):
+        scores = []
+        for move in moves:
+            state.make(move)
+            scores.append(evaluate(state, color, self.weights))
+            state.unmake(move)
+        return scores
+
+    def evaluate(self, state, color):
+        return evaluate(state, color, self.weights)
+
+    def describe(self):
+        return f"heuristic {self.weights}"
+
+
+# model files are read once; heuristic evaluators are kept per weights
+_evaluators = {}
+
+
+def load_evaluator(name, weights = WEIGHTS):
+    """ The Evaluator named by an --evaluator option: "heuristic" (with
+        weights) or a model file.
+    """
+    key = (name, weights) if name == "heuristic" else name
+    if key not in _evaluators:
+        if name == "heuristic":
+            _evaluators[key] = HeuristicEvaluator(weights)
+        else:
+            # NumPy is only needed for learned evaluators
+            from learned import load_model
+            _evaluators[key] = load_model(name)
+    return _evaluators[key]
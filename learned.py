@@ -0,0 +1,165 @@
+""" Learned evaluators: a linear model or a small MLP over board features.
+
+Features describe a position from the point of view of the side that has just
+moved (the perspective), with the other side to move:
+
+    heights          (25, 5) one-hot cell heights
+    workers          25 perspective worker cells, then 25 opponent cells
+    standing         perspective workers on heights 0, 1 and 2, then opponent's
+    climbs           workers on height 2 next to a free height 3 cell, perspective then opponent
+    mobility         legal worker steps / 8, perspective then opponent
+    current_score    (height, center, distance) / 8, perspective then opponent
+
+Models predict the game's outcome for the perspective side, from -1 to 1,
+and report it in search units (times SCALE). All the candidate actions of a
+turn are turned into child positions and scored in one matrix multiply.
+"""
+from abc import abstractmethod
+
+import numpy as np
+
+from batch_eval import STEP, _padded, _sides, current_scores
+from engine import CELLS
+from evaluator import Evaluator
+
+SCALE = 1000
+N_FEATURES = CELLS * 5 + 2 * CELLS + 6 + 2 + 2 + 6
+
+
+def _side_terms(padded, occupied, workers):
+    """ Climbs and mobility of the workers (N, 2) of one side. """
+    rows = np.arange(padded.shape[0])[:, None, None]
+    worker_height = padded[rows[:, :, 0], workers]
+    neighbors = STEP[workers]
+    neighbor_height = padded[rows, neighbors]
+    free = ~occupied[rows, neighbors]
+    climbs = ((worker_height == 2)[:, :, None] & free & (neighbor_height == 3)).any(axis = 2).sum(axis = 1)
+    steps = (free & (neighbor_height <= worker_height[:, :, None] + 1) & (neighbor_height < 4)).sum(axis = (1, 2))
+    return worker_height, climbs, steps
+
+
+def features(heights, workers, perspective):
+    """ (N, N_FEATURES) float features of N positions.
+        Args:
+            heights (array): (N, 25) cell heights.
+            workers (array): (N, 4) cells of workers A, B, Y, Z.
+            perspective (array): (N,) the color that has just moved.
+    """
+    heights = np.asarray(heights, dtype = np.int64)
+    workers = np.asarray(workers, dtype = np.int64)
+    perspective = np.asarray(perspective, dtype = np.int64)
+    n = heights.shape[0]
+    rows = np.arange(n)[:, None]
+    mine, theirs = _sides(workers, perspective)
+    padded, occupied = _padded(heights, workers)
+
+    out = np.zeros((n, N_FEATURES), dtype = np.float64)
+    column = 0
+    out[:, :CELLS * 5].reshape(n, CELLS, 5)[np.arange(n)[:, None], np.arange(CELLS), np.minimum(heights, 4)] = 1
+    column += CELLS * 5
+    for side in (mine, theirs):
+        out[rows, column + side] = 1
+        column += CELLS
+    terms = [_side_terms(padded, occupied, side) for side in (mine, theirs)]
+    for worker_height, _, _ in terms:
+        for height in range(3):
+            out[:, column] = (worker_height == height).sum(axis = 1)
+            column += 1
+    for _, climbs, _ in terms:
+        out[:, column] = climbs
+        column += 1
+    for _, _, steps in terms:
+        out[:, column] = steps / 8
+        column += 1
+    out[:, column:column + 3] = current_scores(heights, workers, perspective) / 8
+    out[:, column + 3:column + 6] = current_scores(heights, workers, 1 - perspective) / 8
+    return out
+
+
+def state_arrays(state):
+    """ (25,) heights and (4,) worker cells of a GameState. """
+    return np.array([state.height(cell) for cell in range(CELLS)], dtype = np.int64), np.array(state.workers, dtype = np.int64)
+
+
+def action_features(state, color, moves):
+    """ Features of the position after each Move, from color's point of view. """
+    heights, workers = state_arrays(state)
+    count = len(moves)
+    index = np.arange(count)
+    child_heights = np.tile(heights, (count, 1))
+    child_workers = np.tile(workers, (count, 1))
+    child_workers[index, [move.worker for move in moves]] = [move.end for move in moves]
+    child_heights[index, [move.build for move in moves]] += 1
+    return features(child_heights, child_workers, np.full(count, color))
+
+
+class LearnedEvaluator(Evaluator):
+    @abstractmethod
+    def predict(self, x):
+        """ Predicted outcome in [-1, 1] for each row of features. """
+
+    def score_actions(self, state, color, moves):
+        if not moves:
+            return []
+        return [int(score) for score in np.rint(self.predict(action_features(state, color, moves)) * SCALE)]
+
+    def evaluate(self, state, color):
+        heights, workers = state_arrays(state)
+        # the side that just moved is the opponent of color
+        return -int(np.rint(self.predict(features(heights[None], workers[None], np.array([1 - color])))[0] * SCALE))
+
+
+class LinearEvaluator(LearnedEvaluator):
+    def __init__(self, weights, bias):
+        self.weights = np.asarray(weights, dtype = np.float64)
+        self.bias = float(bias)
+
+    def predict(self, x):
+        return np.clip(x @ self.weights + self.bias, -1, 1)
+
+    def arrays(self):
+        return {"weights": self.weights, "bias": np.array(self.bias)}
+
+    def describe(self):
+        return f"linear model, {len(self.weights)} features"
+
+
+class MLPEvaluator(LearnedEvaluator):
+    """ One ReLU hidden layer and a tanh output. """
+    def __init__(self, w1, b1, w2, b2):
+        self.w1 = np.asarray(w1, dtype = np.float64)
+        self.b1 = np.asarray(b1, dtype = np.float64)
+        self.w2 = np.asarray(w2, dtype = np.float64)
+        self.b2 = float(b2)
+
+    def hidden(self, x):
+        return np.maximum(x @ self.w1 + self.b1, 0)
+
+    def predict(self, x):
+        return np.tanh(self.hidden(x) @ self.w2 + self.b2)
+
+    def arrays(self):
+        return {"w1": self.w1, "b1": self.b1, "w2": self.w2, "b2": np.array(self.b2)}
+
+    def describe(self):
+        return f"mlp model, {self.w1.shape[1]} hidden units"
+
+
+MODELS = {"linear": LinearEvaluator, "mlp": MLPEvaluator}
+
+
+def save_model(model, path):
+    kind = next(name for name, cls in MODELS.items() if isinstance(model, cls))
+    np.savez(path, kind = kind, n_features = N_FEATURES, **model.arrays())
+
+
+def load_model(path):
+    with np.load(path) as data:
+        kind = str(data["kind"])
+        if int(data["n_features"]) != N_FEATURES:
+            raise ValueError(f"{path} was trained on {int(data['n_features'])} features, expected {N_FEATURES}")
+        if kind == "linear":
+            return LinearEvaluator(data["weights"], data["bias"])
+        if kind == "mlp":
+            return MLPEvaluator(data["w1"], data["b1"], data["w2"], data["b2"])
+    raise ValueError(f"{path} holds an unknown model kind {kind}")
@@ -1,59 +1,129 @@
 import sys
 import random
 import argparse
-from operator import sub
-from copy import deepcopy
-
-cardinalToPos = dict({
-    "n": (-1,0), 
-    "ne": (-1,1), 
-    "e": (0,1), 
-    "se": (1,1), 
-    "s": (1,0), 
-    "sw": (1,-1), 
-    "w": (0,-1), 
-    "nw": (-1,-1)})
-
-posToCardinal  = {v: k for k, v in cardinalToPos.items()}
+from search import Searcher
+from mcts import MCTS
+from book import OPENING, describe, open_book
+from evaluator import load_evaluator
+from profiling import Profiler, instrument
+from render import RENDER_MODES, Renderer
+from engine import GameState, Move, CELL_DIRECTIONS, DIRECTION_CELLS, DISTANCE, MIDDLE_CELL, NEIGHBORS, POSITIONS, WEIGHTS, WORKERS, WORKER_INDEX, WHITE, BLUE, legal_actions, to_cell
 
 BLANK = " "
+COLOR_INDEX = {"white": WHITE, "blue": BLUE}
 MIDDLE = (2,2)
 
+PLAYER_TYPES = ["human", "heuristic", "random", "search", "mcts"]
+
+# settings for the search and mcts players
+DEFAULT_AI_OPTIONS = {
+    "search_time": 1.0,
+    "search_depth": None,
+    "table_mb": 16,
+    "mcts_playouts": 2000,
+    "mcts_time": None,
+    "mcts_workers": 1,
+    "mcts_parallel": "root",
+    # opening book and tablebase file (see build_book.py), also used by the heuristic player
+    "book": None,
+    # evaluator for the heuristic and search players, "heuristic" or a model file (see evaluator.py)
+    "evaluator": None,
+    # c1, c2, c3 for height, center and distance in the heuristic and search players' scores
+    "weights": WEIGHTS,
+    # options for one color's player only, ie: "blue": {"weights": (4, 2, 1)}
+    "white": None,
+    "blue": None,
+}
+
+def parse_weights(text):
+    """ "3,2,1" as the tuple of integer weights (3, 2, 1). """
+    weights = tuple(int(weight) for weight in text.split(","))
+    if len(weights) != 3:
+        raise argparse.ArgumentTypeError(f"expected three weights c1,c2,c3, got {text}")
+    return weights
+
 class Slot():
-    def __init__(self, position):
-        self.position = position
-        self.curr_worker = BLANK
-        self.curr_height = 0
-        self.possibleMoves = self.boundaryCheck()
+    """ View of one board cell backed by the game's bitboard state. """
+    __slots__ = ("state", "cell")
+
+    def __init__(self, state, position):
+        self.state = state
+        self.cell = to_cell(position)
 
     def __repr__(self):
         rep = f"{self.curr_height}{self.curr_worker}"
         return rep
 
-    def boundaryCheck(self):
-        possible_moves = []
-        all_moves = [(1, 0), (1, 1), (1, -1), (0, -1), (0, 1), (-1, 0), (-1, -1), (-1, 1)]
-        for move in all_moves:
-            pos = tuple(map(sum,zip(self.position, move)))
-            if pos[0] < 0 or pos[0] > 4 or pos[1] < 0 or pos[1] > 4:
-                continue
-            else:
-                possible_moves.append(pos)
+    @property
+    def position(self):
+        return POSITIONS[self.cell]
+
+    @property
+    def possibleMoves(self):
+        return [POSITIONS[n] for n in NEIGHBORS[self.cell]]
+
+    @property
+    def curr_worker(self):
+        worker = self.state.worker_at(self.cell)
+        return BLANK if worker is None else worker
+
+    @property
+    def curr_height(self):
+        return self.state.height(self.cell)
+
+    @curr_height.setter
+    def curr_height(self, height):
+        self.state.set_height(self.cell, height)
+
+class WorkerPositions():
+    """ Dict-like view of a player's worker positions, ie: {"A": (3, 1), ...},
+        backed by a GameState. Setting a position moves the worker.
+    """
+    __slots__ = ("state", "workers")
+
+    def __init__(self, state, workers):
+        self.state = state
+        self.workers = workers
+
+    def __getitem__(self, worker):
+        if worker not in self.workers:
+            raise KeyError(worker)
+        return POSITIONS[self.state.workers[WORKER_INDEX[worker]]]
+
+    def __setitem__(self, worker, position):
+        if worker not in self.workers:
+            raise KeyError(worker)
+        self.state.move(WORKER_INDEX[worker], to_cell(position))
 
-        return possible_moves
+    def __iter__(self):
+        return iter(self.workers)
+
+    def __len__(self):
+        return len(self.workers)
+
+    def keys(self):
+        return list(self.workers)
+
+    def items(self):
+        return [(worker, self[worker]) for worker in self.workers]
+
+    def __repr__(self):
+        return repr(dict(self.items()))
 
 class Player():
+    __slots__ = ("player_type", "score_display", "score", "worker_pos")
+
     def __init__(self, player_type, score_display):
         self.player_type = player_type
         self.score_display = score_display
         self.score = None
+        # a view over a state of its own until a game lays its board
+        self.worker_pos = WorkerPositions(GameState.start(), self.workers)
 
 class WhitePlayer(Player):
-    def __init__(self, player_type, score_display):
-        super().__init__(player_type=player_type, score_display=score_display)
-        self.workers = ["A", "B"]
-        self.worker_pos = {"A": [3, 1], "B": [1, 3]}
-        self.color = "white"
+    __slots__ = ()
+    workers = ["A", "B"]
+    color = "white"
 
     def __repr__(self):
         if self.score_display == "off":
@@ -62,11 +132,9 @@ class WhitePlayer(Player):
             return f"white (AB), {self.score}"
 
 class BluePlayer(Player):
-    def __init__(self, player_type, score_display):
-        super().__init__(player_type=player_type, score_display=score_display)
-        self.workers = ["Y", "Z"]
-        self.worker_pos = {"Y": [1, 1], "Z": [3, 3]}
-        self.color = "blue"
+    __slots__ = ()
+    workers = ["Y", "Z"]
+    color = "blue"
 
     def __repr__(self):
         if self.score_display == "off":
@@ -74,96 +142,99 @@ class BluePlayer(Player):
         else:
             return f"blue (YZ), {self.score}"
 
-        
 class Santorini():
-    def __init__(self, white, blue, undo_redo, score_display):
+    __slots__ = ("board", "white", "blue", "turn_num", "undo_redo", "score_display", "win_state", "win_color", "last_move", "renderer", "rng", "ai_options", "player_options", "ais", "state")
+    all_workers = ["A", "B", "Y", "Z"]
+    directions = ["n", "ne", "e", "se", "s", "sw", "w", "nw",]
+    undo_redo_options = ["undo", "redo", "next"]
+
+    def __init__(self, white, blue, undo_redo, score_display, render = "full", rng = None, ai_options = None):
         self.board = []
         self.white = white
         self.blue = blue
-        self.all_workers = ["A", "B", "Y", "Z"]
         self.turn_num = 1
-        self.directions = ["n", "ne", "e", "se", "s", "sw", "w", "nw",]
         self.undo_redo = undo_redo
         self.score_display = score_display
         self.win_state = False
         self.win_color = None
-        self.undo_redo_options = ["undo", "redo", "next"]
-
-    # fill up the board with empty slots
-    def set_up_board(self):
+        self.last_move = None
+        # render is a Renderer or one of RENDER_MODES, headless games use "none";
+        # rng (a random.Random) lets batch runs seed each game, otherwise the
+        # global random module is used
+        self.renderer = render if isinstance(render, Renderer) else Renderer(render)
+        self.rng = rng
+        # search and mcts players keep their AI between moves so tables and pools carry over
+        self.ai_options = dict(DEFAULT_AI_OPTIONS)
+        if ai_options:
+            self.ai_options.update(ai_options)
+        self.player_options = {color: dict(self.ai_options, **(self.ai_options[color] or {})) for color in ("white", "blue")}
+        self.ais = {}
+
+    # lay the slot views over a bitboard, the starting layout by default
+    def set_up_board(self, state = None):
+        self.state = GameState.start() if state is None else state
+        for player in (self.white, self.blue):
+            player.worker_pos = WorkerPositions(self.state, player.workers)
+        self.board = []
         for i in range(5):
             row = []
             for j in range(5):
-                new_slot = Slot(position = (i, j))
+                new_slot = Slot(self.state, position = (i, j))
                 row.append(new_slot)
             self.board.append(row)
 
-        # add workers to their starting positions
-        self.board[1][1].curr_worker = "Y"
-        self.board[1][3].curr_worker = "B"
-        self.board[3][1].curr_worker = "A"
-        self.board[3][3].curr_worker = "Z"
-
     # print the string representation of the board
     def display_board(self):
-        barrier = "+--+--+--+--+--+\n|"
-        final_barrier = "+--+--+--+--+--+"
-        for i in range(5):
-            print(barrier, end = "")
-            for j in range(5):
-                print(f"{repr(self.board[i][j])}|", end = "")
-            print('\n', end = "")
-        print(final_barrier)
+        self.renderer.board(self.board)
 
     def valid_move(self, player, worker, build = False):
-        """ Returns true if it is valid. Check if the posistion exists, If there is another
-            player there, and if the height is less than 1 greater than it.  
+        """ Returns the positions the worker can move to (or build on). A position is
+            valid if it is on the board, has no worker on it and is at most one level
+            above the worker (when moving) or is not domed (when building).
             Args: 
                 player (Player): The player trying to move.
-                direction (string): The move it is trying to make. It is a direction ie: "n", "ne" 
+                worker (string): The worker that is moving, ie: "A"
+                build (bool): Whether to list builds instead of moves.
             Return: 
-                (tuple) : The next posistion if valid None if not valid.
+                (list) : The valid positions as (row, col) tuples.
         """
-        valid_moves = []
-        possible_moves = self.board[player.worker_pos[worker][0]][player.worker_pos[worker][1]].possibleMoves
-
-        for move in possible_moves:
-            if self.board[move[0]][move[1]].curr_worker != BLANK:
-                continue
-            elif self.board[player.worker_pos[worker][0]][player.worker_pos[worker][1]].curr_height + 1 < self.board[move[0]][move[1]].curr_height and build == False:
-                continue
-            elif build == True and self.board[move[0]][move[1]].curr_height == 4 :
-                continue
-            else: 
-                valid_moves.append(move)
-        
-        return valid_moves
+        index = WORKER_INDEX[worker]
+        if build:
+            cells = self.state.builds(index)
+        else:
+            cells = self.state.moves(index)
+        return [POSITIONS[cell] for cell in cells]
 
 
     def move_worker(self, player, worker, position):
-        worker_pos = player.worker_pos[worker]
-        self.board[worker_pos[0]][worker_pos[1]].curr_worker = BLANK
-        self.board[position[0]][position[1]].curr_worker = worker
-        player.worker_pos[worker] = position
+        self.state.move(WORKER_INDEX[worker], to_cell(position))
+
+    def record_move(self, worker, pos_before, position, build):
+        self.last_move = Move(WORKER_INDEX[worker], to_cell(pos_before), to_cell(position), to_cell(build))
+
+    def make_move(self, move):
+        """ Replays a recorded move (see record_move) as a full turn. """
+        player = self.white if self.turn_num % 2 == 1 else self.blue
+        self.state.make(move)
+        self.turn_num += 1
+        if self.game_over(player):
+            self.win_state = True
+            self.win_color = player.color
+
+    def unmake_move(self, move):
+        """ Takes back a move made on the previous turn. """
+        self.turn_num -= 1
+        self.state.unmake(move)
+        self.win_state = False
+        self.win_color = None
 
     def game_over(self, player):
-        player_workers = player.workers
-        pos1 = player.worker_pos[player_workers[0]]
-        pos2 = player.worker_pos[player_workers[1]]
-        if self.board[pos1[0]][pos1[1]].curr_height == 3 or self.board[pos2[0]][pos2[1]].curr_height == 3:
-            return True
-        else:
-            return False
+        return self.state.has_won(COLOR_INDEX[player.color])
 
 
     def no_possible_moves(self, player):
-        player_workers = player.workers
-        pos1 = player.worker_pos[player_workers[0]]
-        pos2 = player.worker_pos[player_workers[1]]
-        valid_moves = self.valid_move(player,player.workers[0])
-        valid_moves.extend(self.valid_move(player,player.workers[1]))
-        
-        if len(valid_moves) == 0:
+        # can_move stops at the first worker with a legal move
+        if not self.state.can_move(COLOR_INDEX[player.color]):
             self.win_state = True
             if player.color == "white":
                 self.win_color = "blue"
@@ -176,39 +247,50 @@ class Santorini():
         opponent1 = opponent.worker_pos[opponent.workers[0]]
         opponent2 = opponent.worker_pos[opponent.workers[1]]
 
-        height = self.board[worker1[0]][worker1[1]].curr_height + self.board[worker2[0]][worker2[1]].curr_height
-        center_score = ((2 - self.distance_formula(worker1, MIDDLE)) + (2 - self.distance_formula(worker2, MIDDLE)))
-        moving_distance_score = min(self.distance_formula(worker1, opponent1), self.distance_formula(worker2, opponent1))
-        static_distance_score = min(self.distance_formula(worker1, opponent2), self.distance_formula(worker2, opponent2))
+        worker1, worker2 = to_cell(worker1), to_cell(worker2)
+        distance1, distance2 = DISTANCE[worker1], DISTANCE[worker2]
+        opponent1, opponent2 = to_cell(opponent1), to_cell(opponent2)
+
+        height = self.state.height(worker1) + self.state.height(worker2)
+        center_score = ((2 - distance1[MIDDLE_CELL]) + (2 - distance2[MIDDLE_CELL]))
+        moving_distance_score = min(distance1[opponent1], distance2[opponent1])
+        static_distance_score = min(distance1[opponent2], distance2[opponent2])
         distance_score = 8 - (moving_distance_score + static_distance_score)
 
         player.score = (height, center_score, distance_score)
         return player.score
 
+    def prompt(self, text):
+        # batched output has to reach the terminal before the human is asked
+        self.renderer.flush()
+        return input(text)
+
+    def ask_undo_redo(self):
+        """ Asks for undo, redo or next when undo/redo is on.
+            Return:
+                (string) : "undo" or "redo", None to play the turn.
+        """
+        if self.undo_redo == "on": 
+            undo_redo_input = None
+            while undo_redo_input not in self.undo_redo_options:
+                undo_redo_input = self.prompt("undo, redo, or next\n")
+                if undo_redo_input in ["undo", "redo"]:
+                    return undo_redo_input
+        return None
+
     def turn(self, player):
         self.no_possible_moves(player)
         if self.win_state:
-            print(f"Turn: {self.turn_num}, {repr(player)}")
-            print(f"{self.win_color} has won")
-            sys.exit()
-        print(f"Turn: {self.turn_num}, {repr(player)}")
+            return self.announce_winner(player)
+        self.renderer.line("turn", f"Turn: {self.turn_num}, {repr(player)}")
         worker = direction = build = None
-        undo_redo_input = None
 
-        if self.undo_redo == "on": 
-            while undo_redo_input not in self.undo_redo_options:
-                undo_redo_input = input("undo, redo, or next\n")
-                if undo_redo_input not in self.undo_redo_options:
-                    undo_redo_input = None
-                elif undo_redo_input == "next":
-                    undo_redo_input == None
-                    break
-                else:
-                    return undo_redo_input
-                    break
+        undo_redo_input = self.ask_undo_redo()
+        if undo_redo_input:
+            return undo_redo_input
             
         while worker not in self.all_workers:
-            worker = input("Select a worker to move\n")
+            worker = self.prompt("Select a worker to move\n")
             worker = worker.upper()
             if worker not in self.all_workers:
                 print("Not a valid worker")
@@ -217,15 +299,15 @@ class Santorini():
                 worker = None
 
         while direction not in self.directions:
-            direction = input("Select a direction to move (n, ne, e, se, s, sw, w, nw)\n")
+            direction = self.prompt("Select a direction to move (n, ne, e, se, s, sw, w, nw)\n")
             if direction not in self.directions:
                 print("Not a valid direction")
                 continue
 
-            valid_moves = self.valid_move(player, worker)
-            movement = cardinalToPos[direction]
-            nextPosition = tuple(map(sum,zip(player.worker_pos[worker], movement)))
-            if nextPosition in valid_moves:
+            next_cell = DIRECTION_CELLS[to_cell(player.worker_pos[worker])].get(direction)
+            if next_cell is not None and self.state.move_mask(WORKER_INDEX[worker]) >> next_cell & 1:
+                nextPosition = POSITIONS[next_cell]
+                pos_before = player.worker_pos[worker]
                 self.move_worker(player, worker, nextPosition)
             else:
                 print(f"Cannot move {direction}")
@@ -233,16 +315,16 @@ class Santorini():
                 continue
                 
         while build not in self.directions:
-            build = input("Select a direction to build (n, ne, e, se, s, sw, w, nw)\n")
+            build = self.prompt("Select a direction to build (n, ne, e, se, s, sw, w, nw)\n")
             if build not in self.directions:
                 print("Not a valid direction")
                 continue
 
-            valid_moves = self.valid_move(player, worker, build = True)
-            movement = cardinalToPos[build]
-            nextPosition = tuple(map(sum,zip(player.worker_pos[worker], movement)))
-            if nextPosition in valid_moves:
-                self.board[nextPosition[0]][nextPosition[1]].curr_height += 1
+            next_cell = DIRECTION_CELLS[to_cell(player.worker_pos[worker])].get(build)
+            if next_cell is not None and self.state.build_mask(WORKER_INDEX[worker]) >> next_cell & 1:
+                nextPosition = POSITIONS[next_cell]
+                self.state.build(next_cell)
+                self.record_move(worker, pos_before, player.worker_pos[worker], nextPosition)
             else:
                 print(f"Cannot build {build}")
                 build = None
@@ -254,30 +336,29 @@ class Santorini():
             self.win_state = True
             self.win_color = player.color
 
+    def choose(self, options):
+        if self.rng is None:
+            return random.choice(options)
+        return self.rng.choice(options)
+
+    def announce_winner(self, player):
+        self.renderer.final(self.board)
+        self.renderer.line("winner", f"Turn: {self.turn_num}, {repr(player)}")
+        self.renderer.line("winner", f"{self.win_color} has won")
+        return "over"
+
     def determine_direction(self, pos_before, pos_after):
-        direction = tuple(map(sub, pos_after, pos_before))
-        return posToCardinal[direction]
+        return CELL_DIRECTIONS[to_cell(pos_before)][to_cell(pos_after)]
 
     def random_turn(self, player):
         self.no_possible_moves(player)
         if self.win_state:
-            print(f"Turn: {self.turn_num}, {repr(player)}")
-            print(f"{self.win_color} has won")
-            sys.exit()
-        print(f"Turn: {self.turn_num}, {repr(player)}")
+            return self.announce_winner(player)
+        self.renderer.line("turn", f"Turn: {self.turn_num}, {repr(player)}")
 
-        undo_redo_input = None
-        if self.undo_redo == "on": 
-            while undo_redo_input not in self.undo_redo_options:
-                undo_redo_input = input("undo, redo, or next\n")
-                if undo_redo_input not in self.undo_redo_options:
-                    undo_redo_input = None
-                elif undo_redo_input == "next":
-                    undo_redo_input == None
-                    break
-                else:
-                    return undo_redo_input
-                    break
+        undo_redo_input = self.ask_undo_redo()
+        if undo_redo_input:
+            return undo_redo_input
 
         worker1 = player.workers[0]
         worker2 = player.workers[1]
@@ -290,23 +371,24 @@ class Santorini():
         }
 
         if (len(worker1_moves) > 0) and (len(worker2_moves) > 0):
-            worker = random.choice([worker1, worker2])
-            move = random.choice(move_mappings[worker])
+            worker = self.choose([worker1, worker2])
+            move = self.choose(move_mappings[worker])
             
         elif len(worker1_moves) > 0:
             worker = worker1
-            move = random.choice(move_mappings[worker])
+            move = self.choose(move_mappings[worker])
         else:
             worker = worker2
-            move = random.choice(move_mappings[worker])
+            move = self.choose(move_mappings[worker])
         
         pos_before = (player.worker_pos[worker][0], player.worker_pos[worker][1])
         self.move_worker(player, worker, move)
 
         valid_builds = self.valid_move(player, worker, build = True)
-        build = random.choice(valid_builds)
-        self.board[build[0]][build[1]].curr_height += 1
-        print(f"{worker},{(self.determine_direction(pos_before, move))},{self.determine_direction(move, build)}")
+        build = self.choose(valid_builds)
+        self.state.build(to_cell(build))
+        self.record_move(worker, pos_before, move, build)
+        self.renderer.line("move", f"{worker},{(self.determine_direction(pos_before, move))},{self.determine_direction(move, build)}")
 
         self.turn_num += 1
         self.display_board()
@@ -314,37 +396,15 @@ class Santorini():
             self.win_state = True
             self.win_color = player.color
         
-    def distance_formula(self, pos1, pos2):
-        distance = tuple(map(sub, pos1, pos2))
-        return max(abs(distance[0]), abs(distance[1]))
-
-    def heuristic_turn(self, player, opponent):
-        self.no_possible_moves(player)
-        if self.win_state:
-            print(f"Turn: {self.turn_num}, {repr(player)}")
-            print(f"{self.win_color} has won")
-            sys.exit()
-        print(f"Turn: {self.turn_num}, {repr(player)}")
-
-        undo_redo_input = None
-        if self.undo_redo == "on": 
-            while undo_redo_input not in self.undo_redo_options:
-                undo_redo_input = input("undo, redo, or next\n")
-                if undo_redo_input not in self.undo_redo_options:
-                    undo_redo_input = None
-                elif undo_redo_input == "next":
-                    undo_redo_input == None
-                    break
-                else:
-                    return undo_redo_input
-                    break
-        
-        c1 = 3
-        c2 = 2
-        c3 = 1
-
-        best = 0
-        ties = []
+    def heuristic_scores(self, player, opponent):
+        """ Scores every move of player with c1*height + c2*center + c3*distance,
+            the weights coming from player's "weights" option.
+            Moving onto height 3 wins and scores infinity. batch_eval.py computes
+            the same scores with NumPy.
+            Return:
+                (list) : (moving worker, static worker, position, score) per move.
+        """
+        c1, c2, c3 = self.player_options[player.color]["weights"]
 
         all_valid_moves = []
         worker1_moves = self.valid_move(player, player.workers[0])
@@ -354,35 +414,64 @@ class Santorini():
         for move in worker2_moves:
             all_valid_moves.append((player.workers[1], player.workers[0], move))
 
+        opponent1 = to_cell(opponent.worker_pos[opponent.workers[0]])
+        opponent2 = to_cell(opponent.worker_pos[opponent.workers[1]])
+        scores = []
         for move in all_valid_moves:
-            moving_height = self.board[move[2][0]][move[2][1]].curr_height
-            static_height = self.board[player.worker_pos[move[1]][0]][player.worker_pos[move[1]][1]].curr_height
-            height_score = moving_height + static_height
-            center_score = ((2 - self.distance_formula(move[2], MIDDLE)) + (2 - self.distance_formula(player.worker_pos[move[1]], MIDDLE)))
-            moving_distance_score = min(self.distance_formula(move[2], opponent.worker_pos[opponent.workers[0]]), self.distance_formula(player.worker_pos[move[1]], opponent.worker_pos[opponent.workers[0]]))
-            static_distance_score = min(self.distance_formula(player.worker_pos[move[1]], opponent.worker_pos[opponent.workers[1]]), self.distance_formula(player.worker_pos[move[1]], opponent.worker_pos[opponent.workers[1]]))
+            moving = to_cell(move[2])
+            static = to_cell(player.worker_pos[move[1]])
+            moving_height = self.state.height(moving)
+            height_score = moving_height + self.state.height(static)
+            center_score = ((2 - DISTANCE[moving][MIDDLE_CELL]) + (2 - DISTANCE[static][MIDDLE_CELL]))
+            moving_distance_score = min(DISTANCE[moving][opponent1], DISTANCE[static][opponent1])
+            # the static worker is measured against the second opponent on both sides of the min
+            static_distance_score = DISTANCE[static][opponent2]
             distance_score = 8 - (moving_distance_score + static_distance_score)
 
             if moving_height == 3:
                 move_score = float('inf')
             else:
                 move_score = c1 * height_score + c2 * center_score + c3 * distance_score
+            scores.append((move[0], move[1], move[2], move_score))
+        return scores
+
+    def heuristic_turn(self, player, opponent):
+        self.no_possible_moves(player)
+        if self.win_state:
+            return self.announce_winner(player)
+        self.renderer.line("turn", f"Turn: {self.turn_num}, {repr(player)}")
+
+        undo_redo_input = self.ask_undo_redo()
+        if undo_redo_input:
+            return undo_redo_input
+
+        entry = self.book_entry(player)
+        if entry is not None:
+            return self.play_move(player, entry[0], describe(entry))
 
-            if move_score >= best:
-                if move_score == best:
-                    ties.append(move)
-                else:
-                    ties = [move]
-                    best = move_score
+        evaluator = self.get_evaluator(player)
+        if evaluator is not None:
+            return self.play_move(player, self.evaluator_move(player, evaluator))
         
-        best_score = random.choice(ties)
+        best = None
+        ties = []
+        for move in self.heuristic_scores(player, opponent):
+            move_score = move[3]
+            if best is None or move_score > best:
+                ties = [move]
+                best = move_score
+            elif move_score == best:
+                ties.append(move)
+        
+        best_score = self.choose(ties)
         pos_before = (player.worker_pos[best_score[0]][0], player.worker_pos[best_score[0]][1])
         self.move_worker(player, best_score[0], best_score[2])
 
         valid_builds = self.valid_move(player, best_score[0], build = True)
-        build = random.choice(valid_builds)
-        self.board[build[0]][build[1]].curr_height += 1
-        print(f"{best_score[0]},{(self.determine_direction(pos_before, best_score[2]))},{self.determine_direction(best_score[2], build)}")
+        build = self.choose(valid_builds)
+        self.state.build(to_cell(build))
+        self.record_move(best_score[0], pos_before, best_score[2], build)
+        self.renderer.line("move", f"{best_score[0]},{(self.determine_direction(pos_before, best_score[2]))},{self.determine_direction(best_score[2], build)}")
 
         self.turn_num += 1
         self.display_board()
@@ -390,120 +479,190 @@ class Santorini():
             self.win_state = True
             self.win_color = player.color
 
+    def evaluator_move(self, player, evaluator):
+        """ The heuristic player's Move with an evaluator: a winning climb if
+            there is one, otherwise the move+build action it scores best, all
+            actions scored in one call.
+        """
+        color = COLOR_INDEX[player.color]
+        moves = list(legal_actions(self.state, color))
+        best = [move for move in moves if self.state.height(move.end) == 3]
+        if not best:
+            scores = evaluator.score_actions(self.state, color, moves)
+            top = max(scores)
+            best = [move for move, score in zip(moves, scores) if score == top]
+        return self.choose(best)
+
+    def get_evaluator(self, player):
+        options = self.player_options[player.color]
+        if options["evaluator"] is None:
+            return None
+        return load_evaluator(options["evaluator"], options["weights"])
+
+    def get_ai(self, player):
+        if player.color not in self.ais:
+            options = self.player_options[player.color]
+            if player.player_type == "search":
+                ai = Searcher(options["search_time"], options["search_depth"], options["weights"], options["table_mb"], self.get_evaluator(player))
+            else:
+                seed = self.rng.getrandbits(64) if self.rng is not None else random.getrandbits(64)
+                ai = MCTS(options["mcts_playouts"], options["mcts_time"], options["mcts_workers"], options["mcts_parallel"], seed = seed)
+            self.ais[player.color] = ai
+        return self.ais[player.color]
+
+    def close_ais(self):
+        for ai in self.ais.values():
+            if hasattr(ai, "close"):
+                ai.close()
+
+    def book_entry(self, player):
+        """ The book's (move, kind, depth, score) for player's turn, or None
+            without a book or for a position it does not hold. Opening replies
+            are only used by players scoring with the weights the book was built with.
+        """
+        options = self.player_options[player.color]
+        if options["book"] is None:
+            return None
+        book = open_book(options["book"])
+        entry = book.probe(self.state, COLOR_INDEX[player.color])
+        if entry is not None and entry[1] == OPENING:
+            if tuple(options["weights"]) != book.weights or options["evaluator"] not in (None, "heuristic"):
+                return None
+        return entry
+
+    def play_move(self, player, move, note = None):
+        """ Plays a Move chosen by a computer player as a full turn. """
+        worker = WORKERS[move.worker]
+        pos_before = POSITIONS[move.start]
+        self.move_worker(player, worker, POSITIONS[move.end])
+        self.state.build(move.build)
+        self.last_move = move
+        self.renderer.line("move", f"{worker},{self.determine_direction(pos_before, POSITIONS[move.end])},{self.determine_direction(POSITIONS[move.end], POSITIONS[move.build])}")
+        if note is not None:
+            self.renderer.line("move", note)
 
-    def run(self):
-        self.set_up_board()
+        self.turn_num += 1
         self.display_board()
-        self.play()
+        if self.game_over(player):
+            self.win_state = True
+            self.win_color = player.color
+
+    def ai_turn(self, player):
+        self.no_possible_moves(player)
+        if self.win_state:
+            return self.announce_winner(player)
+        self.renderer.line("turn", f"Turn: {self.turn_num}, {repr(player)}")
+
+        undo_redo_input = self.ask_undo_redo()
+        if undo_redo_input:
+            return undo_redo_input
+
+        entry = self.book_entry(player)
+        if entry is not None:
+            return self.play_move(player, entry[0], describe(entry))
+        ai = self.get_ai(player)
+        move = ai.best_move(self.state, COLOR_INDEX[player.color])
+        self.play_move(player, move, ai.describe())
+
+    def take_turn(self, player, opponent):
+        """ Plays one turn for player with the strategy of its player type.
+            Return:
+                (string) : "undo" or "redo" if requested, "over" if the game had
+                already ended before the turn, None otherwise.
+        """
+        if player.player_type == "human":
+            return self.turn(player)
+        elif player.player_type == "random":
+            return self.random_turn(player)
+        elif player.player_type in ["search", "mcts"]:
+            return self.ai_turn(player)
+        else:
+            return self.heuristic_turn(player, opponent)
 
 
 class Environment():
-    def __init__(self, white_player_type, blue_player_type, undo_redo, score_display):
+    def __init__(self, white_player_type, blue_player_type, undo_redo, score_display, ai_options = None, render = "full"):
         self.white = WhitePlayer(white_player_type, score_display = score_display)
         self.blue = BluePlayer(blue_player_type, score_display = score_display)
-        self.game = Santorini(self.white, self.blue, undo_redo = undo_redo, score_display = score_display)
+        self.game = Santorini(self.white, self.blue, undo_redo = undo_redo, score_display = score_display, render = render, ai_options = ai_options)
+        # history holds one Move per turn played; the first history_index of
+        # them are on the board and the rest can be redone
         self.history_index = 0
         self.history = []
         self.undo_redo_input = None
     
     def keep_history(self):
-        self.history.append(deepcopy(self.game))
+        del self.history[self.history_index:]
+        self.history.append(self.game.last_move)
+        self.history_index += 1
     
     def undo(self):
         if self.history_index > 0:
-            self.game = deepcopy(self.history[self.history_index - 2])
-            self.white = deepcopy(self.game.white)
-            self.blue = deepcopy(self.game.blue)
-        self.history_index -= 2
-        self.run()
+            self.history_index -= 1
+            self.game.unmake_move(self.history[self.history_index])
     
     def redo(self):
         if self.history_index < len(self.history):
-            self.game = deepcopy(self.history[self.history_index])
-            self.white = deepcopy(self.game.white)
-            self.blue = deepcopy(self.game.blue)
-            self.run()
-        else:
-            self.history_index -= 1
-            self.run()
-    
-    def next(self):
-        self.history = self.history[:self.history_index+1]
+            self.game.make_move(self.history[self.history_index])
+            self.history_index += 1
 
     def play(self):
         while True:
-            self.history_index += 1
             if self.game.turn_num % 2 == 1:
-                if self.game.white.player_type == "human":
-                    self.game.current_score(self.white, self.blue)
-                    undo_redo = self.game.turn(self.white)
-                    if undo_redo == "undo" or undo_redo == "redo":
-                        return undo_redo
-                    else:
-                        self.keep_history()
-                        self.next()
-                elif self.game.white.player_type == "random":
-                    self.game.current_score(self.white, self.blue)
-                    undo_redo = self.game.random_turn(self.white)
-                    if undo_redo == "undo" or undo_redo == "redo":
-                        return undo_redo
-                    else:
-                        self.keep_history()
-                        self.next()
-                else:
-                    self.game.current_score(self.white, self.blue)
-                    undo_redo = self.game.heuristic_turn(self.white, self.blue)
-                    if undo_redo == "undo" or undo_redo == "redo":
-                        return undo_redo
-                    else:
-                        self.keep_history()
-                        self.next()
+                player, opponent = self.white, self.blue
             else: 
-                if self.game.blue.player_type == "human":
-                    self.game.current_score(self.blue, self.white)
-                    undo_redo = self.game.turn(self.blue)
-                    if undo_redo == "undo" or undo_redo == "redo":
-                        return undo_redo
-                    else:
-                        self.keep_history()
-                        self.next()
-                elif self.game.blue.player_type == "random":
-                    self.game.current_score(self.blue, self.white)
-                    undo_redo = self.game.random_turn(self.blue)
-                    if undo_redo == "undo" or undo_redo == "redo":
-                        return undo_redo
-                    else:
-                        self.keep_history()
-                        self.next()
-                else:
-                    self.game.current_score(self.blue, self.white)
-                    undo_redo = self.game.heuristic_turn(self.blue, self.white)
-                    if undo_redo == "undo" or undo_redo == "redo":
-                        return undo_redo
-                    else:
-                        self.keep_history()
-                        self.next()
+                player, opponent = self.blue, self.white
+            self.game.current_score(player, opponent)
+            undo_redo = self.game.take_turn(player, opponent)
+            if undo_redo == "over":
+                self.game.close_ais()
+                self.game.renderer.close()
+                sys.exit()
+            elif undo_redo == "undo" or undo_redo == "redo":
+                return undo_redo
+            else:
+                self.keep_history()
     
     def run(self):
         self.game.display_board()
-        self.undo_redo_input = self.play()
-        if self.undo_redo_input == "undo":
-            self.undo()
-        else:
-            self.redo()
+        while True:
+            self.undo_redo_input = self.play()
+            if self.undo_redo_input == "undo":
+                self.undo()
+            else:
+                self.redo()
+            self.game.display_board()
 
     def boot_up(self):
         self.game.set_up_board()
-        self.keep_history()
         self.run()
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Process arguments for Santorini', prog = 'main.py', usage='%(prog)s [white player type] [blue player type] [enable undo/redo] [enable score display]')
-    parser.add_argument('white_player_type', nargs = '?', type=str, default = "human", help='Player type for White player ("human", "random", or "heuristic",',choices = ["human", "heuristic", "random"])
-    parser.add_argument('blue_player_type', nargs = '?', type = str, default= "human", help='Player type for Blue player ("human", "random", or "heuristic",', choices = ["human", "heuristic", "random"])
+    parser.add_argument('white_player_type', nargs = '?', type=str, default = "human", help='Player type for White player ("human", "random", "heuristic", "search" or "mcts")',choices = PLAYER_TYPES)
+    parser.add_argument('blue_player_type', nargs = '?', type = str, default= "human", help='Player type for Blue player ("human", "random", "heuristic", "search" or "mcts")', choices = PLAYER_TYPES)
     parser.add_argument('enable_undo_redo', nargs = '?', type = str, default= "off", help='enable undo/redo ("on" or "off"', choices = ["off", "on"])
     parser.add_argument('enable_score_display', nargs = '?', type = str, default= "off", help='enable score display ("on" or "off"', choices = ["off", "on"])
+    parser.add_argument('--search-time', type = float, default = 1.0, help='seconds per move for the search player')
+    parser.add_argument('--search-depth', type = int, default = None, help='deepest search in plies (default: until time runs out)')
+    parser.add_argument('--table-mb', type = float, default = 16, help='transposition table size in megabytes for the search player (0 turns it off)')
+    parser.add_argument('--mcts-playouts', type = int, default = 2000, help='playouts per move for the mcts player')
+    parser.add_argument('--mcts-time', type = float, default = None, help='seconds per move for the mcts player (default: no limit)')
+    parser.add_argument('--mcts-workers', type = int, default = 1, help='processes running mcts playouts')
+    parser.add_argument('--mcts-parallel', type = str, default = "root", help='how mcts playouts are split over processes', choices = ["root", "tree"])
+    parser.add_argument('--book', type = str, default = None, help='opening book and tablebase file for the computer players (see build_book.py)')
+    parser.add_argument('--weights', type = parse_weights, default = WEIGHTS, help='c1,c2,c3 weights of height, center and distance for the heuristic and search players (integers)')
+    parser.add_argument('--evaluator', type = str, default = None, help='evaluator for the heuristic and search players: "heuristic" or a model file from train_evaluator.py')
+    parser.add_argument('--render', type = str, default = 'full', help='what to print: every board ("full"), turn and move lines only ("moves"), the last board ("final") or nothing ("none")', choices = RENDER_MODES)
+    parser.add_argument('--render-file', type = str, default = None, help='write the output to this file instead of the terminal')
+    parser.add_argument('--flush-every', type = int, default = None, help='collect this many pieces of output before writing them')
+    parser.add_argument('--profile', action = 'store_true', help='time each phase per player type and print a summary to stderr when the game ends')
+    parser.add_argument('--profile-out', type = str, default = None, help='with --profile, also write cProfile stats of the game to this file')
     args = parser.parse_args()
 
-    env = Environment(args.white_player_type, args.blue_player_type, args.enable_undo_redo, args.enable_score_display)
+    ai_options = {option: getattr(args, option) for option in DEFAULT_AI_OPTIONS if hasattr(args, option)}
+    renderer = Renderer(args.render, open(args.render_file, "w") if args.render_file else None, args.flush_every)
+    env = Environment(args.white_player_type, args.blue_player_type, args.enable_undo_redo, args.enable_score_display, ai_options = ai_options, render = renderer)
+    if args.profile or args.profile_out:
+        instrument(env, Profiler(args.profile_out))
     env.boot_up()
\ No newline at end of file
@@ -0,0 +1,254 @@
+""" Monte Carlo Tree Search player.
+
+UCT over combined move+build actions, with playouts that follow the random
+player's policy (pick a worker that can move, a random move, a random build)
+on the bitboard GameState. Playouts can be spread over a process pool in two
+ways:
+
+    root  every process grows its own tree from the same position with its own
+          seed and the root visit counts are summed (root parallelization)
+    tree  one tree in this process; leaves are selected in batches with a
+          virtual loss and their playouts run in the pool (tree parallelization)
+"""
+import math
+import time
+import random
+from multiprocessing import Pool
+
+from search import actions
+from symmetry import unique_actions
+
+EXPLORATION = 1.4
+# leaves selected per batch for each process in tree mode
+TREE_BATCH = 16
+
+
+def playout(state, color, rng):
+    """ Plays random turns from state (color to move) until the game ends.
+        State is changed in place.
+        Return:
+            (int) : The winning color.
+    """
+    while True:
+        worker1, worker2 = 2 * color, 2 * color + 1
+        moves1 = state.moves(worker1)
+        moves2 = state.moves(worker2)
+        if moves1 and moves2:
+            worker = rng.choice((worker1, worker2))
+        elif moves1:
+            worker = worker1
+        elif moves2:
+            worker = worker2
+        else:
+            return 1 - color
+        end = rng.choice(moves1 if worker == worker1 else moves2)
+        if state.height(end) == 3:
+            return color
+        state.move(worker, end)
+        state.build(rng.choice(state.builds(worker)))
+        color = 1 - color
+
+
+class Node():
+    def __init__(self, parent, move, color):
+        self.parent = parent
+        self.move = move
+        # color is the side to move here, so wins are counted for 1 - color
+        self.color = color
+        self.children = []
+        self.untried = None
+        self.visits = 0
+        self.wins = 0.0
+        self.winner = None
+
+    def expand_moves(self, state):
+        """ Untried moves for this node; a winning climb makes every other move
+            pointless. At the root, symmetric moves are only tried once.
+        """
+        moves = unique_actions(state, self.color) if self.parent is None else actions(state, self.color)
+        for move in moves:
+            if state.height(move.end) == 3:
+                return [move]
+        return moves
+
+    def select(self, log_visits):
+        best = None
+        best_value = -1.0
+        for child in self.children:
+            value = child.wins / child.visits + EXPLORATION * math.sqrt(log_visits / child.visits)
+            if value > best_value:
+                best = child
+                best_value = value
+        return best
+
+
+class Tree():
+    def __init__(self, state, color, rng):
+        self.state = state
+        self.rng = rng
+        self.root = Node(None, None, color)
+
+    def descend(self):
+        """ Selects and expands one leaf, applying a virtual visit along the path.
+            Return:
+                (tuple) : The leaf, the state at the leaf and the winner if the
+                leaf is the end of the game (None otherwise).
+        """
+        node = self.root
+        state = self.state.clone()
+        node.visits += 1
+        while True:
+            if node.winner is not None:
+                return node, state, node.winner
+            if node.untried is None:
+                node.untried = node.expand_moves(state)
+                if not node.untried:
+                    node.winner = 1 - node.color
+                    return node, state, node.winner
+            if node.untried:
+                move = node.untried.pop(self.rng.randrange(len(node.untried)))
+                child = Node(node, move, 1 - node.color)
+                node.children.append(child)
+                child.visits += 1
+                if state.height(move.end) == 3:
+                    child.winner = node.color
+                else:
+                    state.make(move)
+                return child, state, child.winner
+            node = node.select(math.log(node.visits))
+            node.visits += 1
+            state.make(node.move)
+
+    def backpropagate(self, node, winner):
+        while node is not None:
+            if winner != node.color:
+                node.wins += 1
+            node = node.parent
+
+    def step(self):
+        node, state, winner = self.descend()
+        if winner is None:
+            winner = playout(state, node.color, self.rng)
+        self.backpropagate(node, winner)
+
+    def root_stats(self):
+        return [(child.move, child.visits, child.wins) for child in self.root.children]
+
+
+def grow(state, color, playouts, deadline, seed):
+    """ Grows one tree and returns its root stats; run in a pool process for root mode. """
+    tree = Tree(state, color, random.Random(seed))
+    count = 0
+    while count < playouts and (deadline is None or time.time() < deadline or count == 0):
+        tree.step()
+        count += 1
+    return tree.root_stats(), count
+
+
+def _grow(args):
+    return grow(*args)
+
+
+def _playouts(jobs):
+    return [playout(state, color, random.Random(seed)) for state, color, seed in jobs]
+
+
+class MCTS():
+    def __init__(self, playouts = 2000, time_budget = None, workers = 1, parallel = "root", seed = None):
+        """ Args:
+                playouts (int): Playouts per move, None for no limit.
+                time_budget (float): Seconds per move, None for no limit.
+                workers (int): Processes to run playouts on.
+                parallel (string): "root" or "tree", how playouts are split.
+                seed (int): Seed for the playout random number generators.
+        """
+        if playouts is None and time_budget is None:
+            raise ValueError("MCTS needs a playout or time budget")
+        if parallel not in ["root", "tree"]:
+            raise ValueError(f"unknown parallel mode {parallel}")
+        self.playouts = playouts if playouts is not None else math.inf
+        self.time_budget = time_budget
+        self.workers = workers
+        self.parallel = parallel
+        self.rng = random.Random(seed)
+        self.pool = None
+        self.stats = None
+
+    def get_pool(self):
+        if self.pool is None:
+            self.pool = Pool(self.workers)
+        return self.pool
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+    def best_move(self, state, color):
+        """ Returns the most visited root move after the playout or time budget. """
+        start = time.perf_counter()
+        # wall clock deadline so pool processes can share it
+        deadline = None if self.time_budget is None else time.time() + self.time_budget
+        if self.workers <= 1:
+            stats, count = grow(state, color, self.playouts, deadline, self.rng.getrandbits(64))
+        elif self.parallel == "root":
+            stats, count = self.root_parallel(state, color, deadline)
+        else:
+            stats, count = self.tree_parallel(state, color, deadline)
+
+        elapsed = time.perf_counter() - start
+        best = max(stats, key = lambda stat: stat[1])
+        self.stats = {
+            "playouts": count,
+            "seconds": elapsed,
+            "playouts_per_sec": count / elapsed if elapsed > 0 else 0.0,
+            "win_rate": best[2] / best[1],
+        }
+        return best[0]
+
+    def root_parallel(self, state, color, deadline):
+        share = self.playouts / self.workers
+        jobs = []
+        for index in range(self.workers):
+            playouts = math.inf if share == math.inf else int(share * (index + 1)) - int(share * index)
+            jobs.append((state, color, playouts, deadline, self.rng.getrandbits(64)))
+
+        totals = {}
+        count = 0
+        for stats, grown in self.get_pool().map(_grow, jobs):
+            count += grown
+            for move, visits, wins in stats:
+                total = totals.setdefault(move, [0, 0.0])
+                total[0] += visits
+                total[1] += wins
+        return [(move, visits, wins) for move, (visits, wins) in totals.items()], count
+
+    def tree_parallel(self, state, color, deadline):
+        tree = Tree(state, color, self.rng)
+        pool = self.get_pool()
+        batch_size = TREE_BATCH * self.workers
+        count = 0
+        while count < self.playouts and (deadline is None or time.time() < deadline or count == 0):
+            batch = []
+            jobs = []
+            for _ in range(int(min(batch_size, self.playouts - count))):
+                node, leaf_state, winner = tree.descend()
+                if winner is None:
+                    jobs.append((leaf_state, node.color, self.rng.getrandbits(64)))
+                batch.append((node, winner))
+            chunksize = max(1, len(jobs) // self.workers)
+            winners = iter(pool.map(_playouts, [jobs[i:i + chunksize] for i in range(0, len(jobs), chunksize)]))
+            results = [winner for chunk in winners for winner in chunk]
+            index = 0
+            for node, winner in batch:
+                if winner is None:
+                    winner = results[index]
+                    index += 1
+                tree.backpropagate(node, winner)
+            count += len(batch)
+        return tree.root_stats(), count
+
+    def describe(self):
+        stats = self.stats
+        return f"mcts: {stats['playouts']} playouts, {stats['playouts_per_sec']:.0f} playouts/sec, win rate {stats['win_rate']:.0%}"
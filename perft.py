@@ -0,0 +1,208 @@
+""" Perft: counts of legal (move, build) sequences, as a correctness oracle.
+
+perft(depth) is the number of action sequences of exactly depth plies from a
+position, where a winning climb ends its line (it counts as a leaf only at
+the last ply) and a side with no moves has none. Two counters are kept:
+
+    perft            the fast one, on GameState with engine.legal_actions
+    reference_perft  built on the rule methods of Santorini (valid_move,
+                     move_worker, game_over, no_possible_moves) and the board
+
+Santorini's rule methods now read the engine's masks too, so reference_perft
+checks that wrapper and is not an independent oracle. tests/test_perft.py
+holds a standalone walk over the original Slot grid that reproduces
+REFERENCE_COUNTS; any new move generator should reproduce them as well, and
+divide shows where two counters disagree.
+
+    python3 perft.py --depth 3
+    python3 perft.py --depth 3 --divide --moves A,se,n Z,w,se
+"""
+import time
+import argparse
+
+from engine import CELL_DIRECTIONS, DIRECTION_CELLS, GameState, Move, WORKERS, WORKER_INDEX, legal_actions
+from main import Santorini, WhitePlayer, BluePlayer
+
+# (moves from the start position, {depth: count}); moves use the "A,se,n"
+# notation the computer players print
+REFERENCE_COUNTS = [
+    ([], {1: 80, 2: 6176, 3: 426384, 4: 29096316}),
+    (["A,e,s", "Y,se,w", "B,s,se", "Y,w,s", "B,w,n", "Z,e,w"], {1: 72, 2: 4424, 3: 304242}),
+    (["A,se,n", "Y,se,e", "A,e,w", "Z,sw,n", "A,ne,sw", "Y,nw,n", "B,se,sw", "Z,ne,nw", "A,nw,se", "Y,s,e", "B,n,w", "Y,n,sw"], {1: 52, 2: 3694, 3: 197399}),
+    (["A,n,ne", "Z,ne,sw", "A,sw,s", "Z,sw,s", "B,n,e", "Z,nw,e", "B,sw,se", "Y,s,nw", "B,n,s", "Y,s,s",
+      "B,w,s", "Z,s,nw", "B,e,e", "Y,n,ne", "A,e,ne", "Z,e,nw", "B,se,e", "Z,ne,w", "B,n,w", "Y,nw,s"], {1: 56, 2: 2689, 3: 126959}),
+    (["B,ne,w", "Y,n,sw", "B,s,n", "Z,w,n", "B,w,w", "Z,ne,ne", "A,s,nw", "Z,nw,sw", "B,e,sw", "Z,se,e",
+      "B,n,w", "Y,s,nw", "A,n,sw", "Y,sw,e", "A,e,nw", "Z,nw,e", "B,sw,ne", "Y,n,n", "B,s,ne", "Z,e,w",
+      "A,sw,nw", "Z,w,n", "B,se,s", "Y,s,s", "B,nw,sw", "Y,ne,se", "B,e,n", "Y,ne,e", "A,n,w", "Z,se,s", "A,sw,ne"], {1: 66, 2: 2033, 3: 113454}),
+]
+
+
+def format_move(move):
+    return f"{WORKERS[move.worker]},{CELL_DIRECTIONS[move.start][move.end]},{CELL_DIRECTIONS[move.end][move.build]}"
+
+
+def parse_move(text, state):
+    """ The Move for "A,se,n" in state; raises ValueError if it is off the board. """
+    worker, direction, build = text.split(",")
+    index = WORKER_INDEX[worker.upper()]
+    start = state.workers[index]
+    end = DIRECTION_CELLS[start].get(direction)
+    if end is None or DIRECTION_CELLS[end].get(build) is None:
+        raise ValueError(f"{text} leaves the board")
+    return Move(index, start, end, DIRECTION_CELLS[end][build])
+
+
+def position_after(moves):
+    """ GameState and color to move after playing moves from the start. """
+    state = GameState.start()
+    for ply, text in enumerate(moves):
+        move = parse_move(text, state)
+        if move.worker >> 1 != ply % 2:
+            raise ValueError(f"{text} is not a move for the side to move")
+        state.make(move)
+    return state, len(moves) % 2
+
+
+def perft(state, color, depth):
+    if depth == 0:
+        return 1
+    if depth == 1:
+        return sum(1 for _ in legal_actions(state, color))
+    nodes = 0
+    for move in list(legal_actions(state, color)):
+        if state.height(move.end) == 3:
+            continue
+        state.make(move)
+        nodes += perft(state, 1 - color, depth - 1)
+        state.unmake(move)
+    return nodes
+
+
+def divide(state, color, depth):
+    """ perft(depth - 1) below each root action, keyed by its notation. """
+    counts = {}
+    for move in list(legal_actions(state, color)):
+        if depth == 1:
+            counts[format_move(move)] = 1
+            continue
+        if state.height(move.end) == 3:
+            counts[format_move(move)] = 0
+            continue
+        state.make(move)
+        counts[format_move(move)] = perft(state, 1 - color, depth - 1)
+        state.unmake(move)
+    return counts
+
+
+def reference_game(state, color):
+    """ A headless Santorini laid over a copy of state with color to move. """
+    game = Santorini(WhitePlayer("human", "off"), BluePlayer("human", "off"), undo_redo = "off", score_display = "off", render = "none")
+    game.set_up_board(state.clone())
+    game.turn_num = 1 + color
+    return game
+
+
+def reference_actions(game):
+    """ Yields (player, worker, start, position, build) for the side to move using only the
+        Santorini rule methods. The board is changed while the caller handles
+        each action and restored afterwards.
+    """
+    player = game.white if game.turn_num % 2 == 1 else game.blue
+    win_state, win_color = game.win_state, game.win_color
+    game.no_possible_moves(player)
+    stuck = game.win_state
+    game.win_state, game.win_color = win_state, win_color
+    if stuck:
+        return
+    for worker in player.workers:
+        start = player.worker_pos[worker]
+        for position in game.valid_move(player, worker):
+            game.move_worker(player, worker, position)
+            for build in game.valid_move(player, worker, build = True):
+                slot = game.board[build[0]][build[1]]
+                slot.curr_height += 1
+                yield player, worker, start, position, build
+                slot.curr_height -= 1
+            game.move_worker(player, worker, start)
+
+
+def reference_perft_game(game, depth):
+    if depth == 0:
+        return 1
+    nodes = 0
+    for player, worker, start, position, build in reference_actions(game):
+        if depth == 1:
+            nodes += 1
+        elif not game.game_over(player):
+            game.turn_num += 1
+            nodes += reference_perft_game(game, depth - 1)
+            game.turn_num -= 1
+    return nodes
+
+
+def reference_perft(state, color, depth):
+    return reference_perft_game(reference_game(state, color), depth)
+
+
+def reference_divide(state, color, depth):
+    game = reference_game(state, color)
+    counts = {}
+    for player, worker, start, position, build in reference_actions(game):
+        name = f"{worker},{game.determine_direction(start, position)},{game.determine_direction(position, build)}"
+        if depth == 1:
+            counts[name] = 1
+        elif game.game_over(player):
+            counts[name] = 0
+        else:
+            game.turn_num += 1
+            counts[name] = reference_perft_game(game, depth - 1)
+            game.turn_num -= 1
+    return counts
+
+
+def check(counter = perft, max_depth = None):
+    """ Compares counter against REFERENCE_COUNTS.
+        Return:
+            (list) : (moves, depth, expected, got) for every mismatch.
+    """
+    mismatches = []
+    for moves, counts in REFERENCE_COUNTS:
+        for depth, expected in sorted(counts.items()):
+            if max_depth is not None and depth > max_depth:
+                continue
+            state, color = position_after(moves)
+            got = counter(state, color, depth)
+            if got != expected:
+                mismatches.append((moves, depth, expected, got))
+    return mismatches
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Count legal action sequences', prog = 'perft.py')
+    parser.add_argument('--depth', type = int, default = 3, help='plies to count to')
+    parser.add_argument('--moves', nargs = '*', default = [], help='moves from the start position, ie: A,se,n')
+    parser.add_argument('--divide', action = 'store_true', help='break the count down by root action and compare with the reference')
+    parser.add_argument('--check', action = 'store_true', help='check the fast counter against the reference table')
+    parser.add_argument('--reference', action = 'store_true', help='with --check, check the reference counter instead')
+    args = parser.parse_args()
+
+    if args.check:
+        mismatches = check(reference_perft if args.reference else perft, max_depth = args.depth)
+        for moves, depth, expected, got in mismatches:
+            print(f"{' '.join(moves) or 'start'} depth {depth}: expected {expected}, got {got}")
+        print("ok" if not mismatches else f"{len(mismatches)} mismatches")
+    elif args.divide:
+        state, color = position_after(args.moves)
+        fast = divide(state, color, args.depth)
+        reference = reference_divide(state, color, args.depth)
+        for name in sorted(set(fast) | set(reference)):
+            mark = "" if fast.get(name) == reference.get(name) else "  <-- reference " + str(reference.get(name))
+            print(f"{name}: {fast.get(name)}{mark}")
+        print(f"total: {sum(fast.values())}, reference {sum(reference.values())}")
+    else:
+        state, color = position_after(args.moves)
+        for depth in range(1, args.depth + 1):
+            start = time.perf_counter()
+            nodes = perft(state.clone(), color, depth)
+            elapsed = time.perf_counter() - start
+            print(f"depth {depth}: {nodes} ({nodes / elapsed if elapsed > 0 else 0:.0f} nodes/sec)")
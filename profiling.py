@@ -0,0 +1,149 @@
+""" Optional per-phase timing for games run from main.py (--profile).
+
+instrument swaps a game's and environment's classes for subclasses whose
+phase methods are wrapped with a timer, so games that are not profiled run
+the original methods with no overhead at all. Each call's wall time goes into
+a power-of-two histogram keyed by phase and by the player type whose turn it
+is. Times are inclusive: valid_move calls made while scoring in
+heuristic_scores count toward both phases.
+
+At the end of the game the summary goes to stderr, and with --profile-out a
+cProfile dump of the whole game is written for pstats or snakeviz.
+"""
+import sys
+import time
+import cProfile
+from collections import defaultdict
+
+# phases timed on Santorini and on Environment
+GAME_PHASES = ["take_turn", "no_possible_moves", "valid_move", "heuristic_scores", "evaluator_move", "current_score", "book_entry", "display_board"]
+ENVIRONMENT_PHASES = ["keep_history", "undo", "redo"]
+
+
+class Histogram():
+    """ Call count, total and a histogram of durations in power-of-two microsecond buckets. """
+    __slots__ = ("calls", "total", "longest", "buckets")
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.longest = 0.0
+        self.buckets = defaultdict(int)
+
+    def add(self, seconds):
+        self.calls += 1
+        self.total += seconds
+        if seconds > self.longest:
+            self.longest = seconds
+        # bucket b holds calls under 2**b microseconds
+        self.buckets[int(seconds * 1e6).bit_length()] += 1
+
+    def bucket_text(self):
+        return " ".join(f"<{_format_us(1 << bucket)}:{count}" for bucket, count in sorted(self.buckets.items()))
+
+
+def _format_us(us):
+    if us >= 1000000:
+        return f"{us // 1000000}s"
+    if us >= 1000:
+        return f"{us // 1000}ms"
+    return f"{us}us"
+
+
+class Profiler():
+    def __init__(self, profile_out = None):
+        """ Args:
+                profile_out (string): Write a cProfile dump here at the end, None for none.
+        """
+        self.histograms = defaultdict(Histogram)
+        self.player_type = None
+        self.profile_out = profile_out
+        self.profile = None
+
+    def record(self, phase, seconds):
+        self.histograms[(phase, self.player_type)].add(seconds)
+
+    def timed(self, phase, method):
+        profiler = self
+        clock = time.perf_counter
+
+        def wrapper(*args, **kwargs):
+            start = clock()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                profiler.record(phase, clock() - start)
+        wrapper.__name__ = method.__name__
+        wrapper.__doc__ = method.__doc__
+        return wrapper
+
+    def start(self):
+        if self.profile_out is not None:
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+
+    def stop(self):
+        if self.profile is not None:
+            self.profile.disable()
+            self.profile.dump_stats(self.profile_out)
+            self.profile = None
+
+    def summary(self):
+        """ Return:
+                (list) : One dict per (phase, player type), by total time.
+        """
+        rows = []
+        for (phase, player_type), histogram in self.histograms.items():
+            rows.append({
+                "phase": phase,
+                "player_type": player_type,
+                "calls": histogram.calls,
+                "total_seconds": histogram.total,
+                "mean_us": histogram.total / histogram.calls * 1e6,
+                "max_us": histogram.longest * 1e6,
+                "histogram": histogram.bucket_text(),
+            })
+        rows.sort(key = lambda row: row["total_seconds"], reverse = True)
+        return rows
+
+    def report(self, file = None):
+        file = file or sys.stderr
+        print(f"{'phase':<18} {'player':<10} {'calls':>8} {'total s':>9} {'mean us':>10} {'max us':>10}  histogram", file = file)
+        for row in self.summary():
+            print(f"{row['phase']:<18} {row['player_type'] or '-':<10} {row['calls']:>8} {row['total_seconds']:>9.3f} {row['mean_us']:>10.1f} {row['max_us']:>10.1f}  {row['histogram']}", file = file)
+        if self.profile_out is not None:
+            print(f"cProfile stats written to {self.profile_out}", file = file)
+
+
+def _charging(profiler, method):
+    def charge(self, player, *args):
+        profiler.player_type = player.player_type
+        return method(self, player, *args)
+    charge.__name__ = method.__name__
+    return charge
+
+
+def instrument(env, profiler):
+    """ Times env's phases and those of its game with profiler from now on. """
+    game = env.game
+    game_methods = {"__slots__": ()}
+    for phase in GAME_PHASES:
+        game_methods[phase] = profiler.timed(phase, getattr(type(game), phase))
+    # the turn's player comes first in both, and later phases are charged to its type
+    for phase in ("current_score", "take_turn"):
+        game_methods[phase] = _charging(profiler, game_methods[phase])
+    game.__class__ = type("Profiled" + type(game).__name__, (type(game),), game_methods)
+
+    env_methods = {phase: profiler.timed(phase, getattr(type(env), phase)) for phase in ENVIRONMENT_PHASES}
+    play = type(env).play
+
+    def play_and_report(self):
+        try:
+            return play(self)
+        except (SystemExit, KeyboardInterrupt):
+            profiler.stop()
+            profiler.report()
+            raise
+    env_methods["play"] = play_and_report
+    env.__class__ = type("Profiled" + type(env).__name__, (type(env),), env_methods)
+    profiler.start()
@@ -0,0 +1,115 @@
+""" Compact binary game records.
+
+A record file is a 5-byte file header (b"SANR" and a format version) followed
+by games appended one after another. Each game is
+
+    white type  1 byte   index into PLAYER_TYPES
+    blue type   1 byte
+    seed        8 bytes  unsigned, little endian
+    winner      1 byte   0 white, 1 blue, 255 unfinished
+    plies       2 bytes  unsigned, little endian
+    moves       1 byte per ply
+
+and each ply byte packs which of the mover's two workers moved (bit 6), the
+move direction (bits 3-5) and the build direction from the new cell (bits
+0-2), with directions numbered n, ne, e, se, s, sw, w, nw. White moves on
+even plies.
+
+Files are written and read as streams, so they can grow to any size without
+being loaded into memory.
+"""
+import struct
+from collections import namedtuple
+
+from engine import CELLS, CELL_DIRECTIONS, DIRECTION_CELLS, Move
+from main import Santorini, WhitePlayer, BluePlayer, PLAYER_TYPES
+
+MAGIC = b"SANR"
+VERSION = 1
+GAME_HEADER = struct.Struct("<BBQBH")
+UNFINISHED = 255
+WINNERS = {"white": 0, "blue": 1, None: UNFINISHED}
+WINNER_NAMES = {code: name for name, code in WINNERS.items()}
+
+GameRecord = namedtuple("GameRecord", ["white", "blue", "seed", "winner", "moves"])
+
+
+# directions are numbered in the order the human player is prompted with
+DIRECTIONS = ["n", "ne", "e", "se", "s", "sw", "w", "nw"]
+STEP_CELL = [[DIRECTION_CELLS[cell].get(name) for name in DIRECTIONS] for cell in range(CELLS)]
+CELL_STEP = [{other: DIRECTIONS.index(name) for other, name in CELL_DIRECTIONS[cell].items()} for cell in range(CELLS)]
+
+
+def encode_move(move):
+    return (move.worker & 1) << 6 | CELL_STEP[move.start][move.end] << 3 | CELL_STEP[move.end][move.build]
+
+
+def decode_move(byte, state, color):
+    """ The Move a ply byte stands for, played by color from state. """
+    worker = 2 * color + (byte >> 6 & 1)
+    start = state.workers[worker]
+    end = STEP_CELL[start][byte >> 3 & 7]
+    return Move(worker, start, end, STEP_CELL[end][byte & 7])
+
+
+def encode_moves(moves):
+    return bytes(encode_move(move) for move in moves)
+
+
+class RecordWriter():
+    """ Appends games to a record file, writing the file header if the file is new. """
+    def __init__(self, path):
+        self.file = open(path, "ab")
+        if self.file.tell() == 0:
+            self.file.write(MAGIC + bytes([VERSION]))
+
+    def write(self, record):
+        header = GAME_HEADER.pack(PLAYER_TYPES.index(record.white), PLAYER_TYPES.index(record.blue), record.seed, WINNERS[record.winner], len(record.moves))
+        self.file.write(header)
+        self.file.write(record.moves)
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_records(path):
+    """ Yields the GameRecords of a file one at a time. """
+    with open(path, "rb") as file:
+        header = file.read(len(MAGIC) + 1)
+        if header[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a game record file")
+        if header[len(MAGIC)] != VERSION:
+            raise ValueError(f"{path} has record format version {header[len(MAGIC)]}, expected {VERSION}")
+        while True:
+            data = file.read(GAME_HEADER.size)
+            if not data:
+                return
+            if len(data) < GAME_HEADER.size:
+                raise ValueError(f"{path} ends in the middle of a game header")
+            white, blue, seed, winner, plies = GAME_HEADER.unpack(data)
+            moves = file.read(plies)
+            if len(moves) < plies:
+                raise ValueError(f"{path} ends in the middle of a game")
+            yield GameRecord(PLAYER_TYPES[white], PLAYER_TYPES[blue], seed, WINNER_NAMES[winner], moves)
+
+
+def replay(record, plies = None):
+    """ Rebuilds the Santorini game of a record after its first plies moves
+        (all of them by default). The game is headless; its players have the
+        record's player types.
+    """
+    white = WhitePlayer(record.white, score_display = "off")
+    blue = BluePlayer(record.blue, score_display = "off")
+    game = Santorini(white, blue, undo_redo = "off", score_display = "off", render = "none")
+    game.set_up_board()
+    moves = record.moves if plies is None else record.moves[:plies]
+    for ply, byte in enumerate(moves):
+        game.make_move(decode_move(byte, game.state, ply % 2))
+    return game
+
@@ -0,0 +1,90 @@
+""" Output of a game: boards, turn headers, move lines and the winner.
+
+A Renderer shows a subset of them depending on its mode:
+
+    full    everything (the classic output, byte for byte)
+    moves   turn headers, move lines and the winner, no boards
+    final   the last board and the winner
+    none    nothing
+
+Boards are built as one string and every piece of output is a single write.
+Output can be batched: with flush_every set, writes are collected and
+written together every flush_every pieces, when the renderer closes and
+before every prompt to a human player.
+"""
+import sys
+
+RENDER_MODES = ["full", "moves", "final", "none"]
+
+# the kinds of output each mode shows
+SHOWN = {
+    "full": {"board", "turn", "move", "winner"},
+    "moves": {"turn", "move", "winner"},
+    "final": {"final", "winner"},
+    "none": set(),
+}
+
+BARRIER = "+--+--+--+--+--+\n"
+
+
+def board_text(board):
+    """ The board of Slot views as printed by display_board, ending in a newline. """
+    rows = []
+    for row in board:
+        rows.append(BARRIER + "|" + "".join(f"{repr(slot)}|" for slot in row) + "\n")
+    return "".join(rows) + BARRIER
+
+
+class Renderer():
+    __slots__ = ("mode", "shown", "file", "flush_every", "pending")
+
+    def __init__(self, mode = "full", file = None, flush_every = None):
+        """ Args:
+                mode (string): One of RENDER_MODES.
+                file (file): Where to write, sys.stdout (at the time of each write) by default.
+                flush_every (int): Collect this many writes before writing them, None to write each at once.
+        """
+        if mode not in SHOWN:
+            raise ValueError(f"{mode} is not a render mode, expected one of {', '.join(RENDER_MODES)}")
+        self.mode = mode
+        self.shown = SHOWN[mode]
+        self.file = file
+        self.flush_every = flush_every
+        self.pending = []
+
+    def write(self, text):
+        if self.flush_every is None:
+            (self.file or sys.stdout).write(text)
+            return
+        self.pending.append(text)
+        if len(self.pending) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        file = self.file or sys.stdout
+        if self.pending:
+            file.write("".join(self.pending))
+            self.pending = []
+        file.flush()
+
+    def close(self):
+        self.flush()
+        if self.file is not None and self.file not in (sys.stdout, sys.stderr):
+            self.file.close()
+
+    def shows(self, kind):
+        return kind in self.shown
+
+    def board(self, board):
+        if "board" in self.shown:
+            self.write(board_text(board))
+
+    def line(self, kind, text):
+        """ Writes a line of output of kind "turn", "move" or "winner" if the mode shows it. """
+        if kind in self.shown:
+            self.write(text + "\n")
+
+    def final(self, board):
+        """ The board at the end of the game, for the final mode. """
+        if "final" in self.shown:
+            self.write(board_text(board))
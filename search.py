@@ -0,0 +1,270 @@
+""" Alpha-beta search player.
+
+Searches combined move+build actions with iterative-deepening negamax and
+alpha-beta pruning on the bitboard GameState. Leaves are scored with the same
+height, center and distance terms the heuristic player uses, taken as the
+difference between the side to move and its opponent. Searched positions are
+kept in a transposition table that lives as long as the Searcher, so results
+carry over between moves.
+"""
+import time
+
+from engine import DISTANCE, MIDDLE_CELL, SIDE_KEYS, WEIGHTS, legal_actions
+from symmetry import unique_actions
+from transposition import EXACT, LOWER, UPPER, TranspositionTable, decode_move
+
+WIN = 1000000
+INFINITY = WIN + 1
+MAX_DEPTH = 64
+
+# how often (in nodes) the clock is checked
+CHECK_EVERY = 1024
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+def side_score(state, color, weights = WEIGHTS):
+    """ c1*height + c2*center + c3*distance for one color, as in Santorini.current_score. """
+    workers = state.workers
+    worker1, worker2 = workers[2 * color], workers[2 * color + 1]
+    opponent1, opponent2 = workers[2 - 2 * color], workers[3 - 2 * color]
+    height = state.height(worker1) + state.height(worker2)
+    center_score = (2 - DISTANCE[worker1][MIDDLE_CELL]) + (2 - DISTANCE[worker2][MIDDLE_CELL])
+    moving_distance_score = min(DISTANCE[worker1][opponent1], DISTANCE[worker2][opponent1])
+    static_distance_score = min(DISTANCE[worker1][opponent2], DISTANCE[worker2][opponent2])
+    distance_score = 8 - (moving_distance_score + static_distance_score)
+    return weights[0] * height + weights[1] * center_score + weights[2] * distance_score
+
+
+def evaluate(state, color, weights = WEIGHTS):
+    """ Leaf score from color's point of view. """
+    return side_score(state, color, weights) - side_score(state, 1 - color, weights)
+
+
+def to_table(score, ply):
+    """ Win/loss scores count plies from the root; the table stores them from the node. """
+    if score >= WIN - MAX_DEPTH:
+        return score + ply
+    if score <= -(WIN - MAX_DEPTH):
+        return score - ply
+    return score
+
+
+def from_table(score, ply):
+    if score >= WIN - MAX_DEPTH:
+        return score - ply
+    if score <= -(WIN - MAX_DEPTH):
+        return score + ply
+    return score
+
+
+def actions(state, color):
+    """ Every legal Move (worker, start, end, build) for color, as a list to sort. """
+    return list(legal_actions(state, color))
+
+
+class Searcher():
+    def __init__(self, time_budget = 1.0, max_depth = None, weights = WEIGHTS, table_mb = 16, evaluator = None):
+        """ Args:
+                time_budget (float): Seconds per move, None for no limit.
+                max_depth (int): Deepest iteration in plies, None for no limit.
+                weights (tuple): c1, c2, c3 for the leaf evaluation.
+                table_mb (float): Transposition table size in megabytes, 0 for none.
+                evaluator (Evaluator): Scores leaves instead of the weights, None for the weights.
+        """
+        self.time_budget = time_budget
+        self.max_depth = max_depth or MAX_DEPTH
+        self.weights = weights
+        self.evaluator = evaluator
+        # killers are indexed by ply; history survives between moves
+        self.killers = [[None, None] for _ in range(MAX_DEPTH + 1)]
+        self.history = {}
+        self.table = TranspositionTable(table_mb) if table_mb else None
+        self.nodes = 0
+        # the clock is read once nodes reaches next_check
+        self.next_check = CHECK_EVERY
+        self.deadline = None
+        self.state = None
+        self.stats = None
+
+    def best_move(self, state, color):
+        """ Searches state for color and returns the best Move found in the time budget. """
+        self.state = state
+        self.nodes = 0
+        self.next_check = CHECK_EVERY
+        start = time.perf_counter()
+        self.deadline = None if self.time_budget is None else start + self.time_budget
+        for killers in self.killers:
+            killers[0] = killers[1] = None
+        if self.table is not None:
+            self.table.new_search()
+            hits, misses = self.table.hits, self.table.misses
+
+        table_move = None
+        if self.table is not None:
+            entry = self.table.probe(state.hash ^ SIDE_KEYS[color])
+            if entry is not None:
+                table_move = decode_move(entry[3], state)
+        # moves that a symmetry of the position maps onto each other are searched once
+        root_moves = self.order(unique_actions(state, color), 0, table_move)
+        best = root_moves[0]
+        best_score = None
+        depth_reached = 0
+        for depth in range(1, self.max_depth + 1):
+            try:
+                score, move = self.search_root(root_moves, depth, color)
+            except SearchTimeout:
+                break
+            best, best_score, depth_reached = move, score, depth
+            # search the previous best first on the next iteration
+            root_moves.remove(move)
+            root_moves.insert(0, move)
+            if abs(score) >= WIN - MAX_DEPTH:
+                break
+
+        elapsed = time.perf_counter() - start
+        self.stats = {
+            "depth": depth_reached,
+            "nodes": self.nodes,
+            "seconds": elapsed,
+            "nodes_per_sec": self.nodes / elapsed if elapsed > 0 else 0.0,
+            "score": best_score,
+        }
+        if self.table is not None:
+            probes = self.table.hits - hits + self.table.misses - misses
+            self.stats["table_hit_rate"] = (self.table.hits - hits) / probes if probes else 0.0
+        return best
+
+    def describe(self):
+        stats = self.stats
+        return f"search: depth {stats['depth']}, {stats['nodes']} nodes, {stats['nodes_per_sec']:.0f} nodes/sec, table hits {stats.get('table_hit_rate', 0.0):.0%}"
+
+    def search_root(self, moves, depth, color):
+        alpha = -INFINITY
+        best = None
+        for move in moves:
+            score = self.child_score(move, depth, 1, -INFINITY, -alpha, color)
+            if best is None or score > alpha:
+                alpha = score
+                best = move
+        if self.table is not None:
+            self.table.store(self.state.hash ^ SIDE_KEYS[color], depth, to_table(alpha, 0), EXACT, best)
+        return alpha, best
+
+    def child_score(self, move, depth, ply, alpha, beta, color):
+        """ Score of playing move for color, searched depth - 1 plies further. """
+        state = self.state
+        if state.height(move.end) == 3:
+            return WIN - ply
+        state.make(move)
+        try:
+            return -self.negamax(depth - 1, ply, alpha, beta, 1 - color)
+        finally:
+            state.unmake(move)
+
+    def negamax(self, depth, ply, alpha, beta, color):
+        self.nodes += 1
+        if self.nodes >= self.next_check:
+            # frontier adds a whole batch of nodes at once, so test with >= and not a multiple
+            self.next_check = self.nodes + CHECK_EVERY
+            if self.deadline is not None and time.perf_counter() > self.deadline:
+                raise SearchTimeout()
+
+        state = self.state
+        if depth == 0:
+            if self.evaluator is not None:
+                return self.evaluator.evaluate(state, color)
+            return evaluate(state, color, self.weights)
+
+        table = self.table
+        table_move = None
+        if table is not None:
+            key = state.hash ^ SIDE_KEYS[color]
+            entry = table.probe(key)
+            if entry is not None:
+                entry_depth, score, flag, code = entry
+                if entry_depth >= depth:
+                    score = from_table(score, ply)
+                    if flag == EXACT:
+                        return score
+                    if flag == LOWER and score >= beta:
+                        return score
+                    if flag == UPPER and score <= alpha:
+                        return score
+                table_move = decode_move(code, state)
+
+        moves = actions(state, color)
+        if not moves:
+            return -(WIN - ply)
+        if depth == 1 and self.evaluator is not None:
+            return self.frontier(moves, ply, color)
+
+        alpha_start = alpha
+        best = -INFINITY
+        best_move = None
+        for move in self.order(moves, ply, table_move):
+            score = self.child_score(move, depth, ply + 1, -beta, -alpha, color)
+            if score > best:
+                best = score
+                best_move = move
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                self.store_cutoff(move, depth, ply)
+                break
+
+        if table is not None:
+            if best <= alpha_start:
+                flag = UPPER
+            elif best >= beta:
+                flag = LOWER
+            else:
+                flag = EXACT
+            table.store(key, depth, to_table(best, ply), flag, best_move)
+        return best
+
+    def frontier(self, moves, ply, color):
+        """ Exact score of a node one ply above the leaves, with every child
+            scored by the evaluator in one batch.
+        """
+        state = self.state
+        self.nodes += len(moves)
+        climbs = [move for move in moves if state.height(move.end) == 3]
+        if climbs:
+            best, best_move = WIN - (ply + 1), climbs[0]
+        else:
+            scores = self.evaluator.score_actions(state, color, moves)
+            best = max(scores)
+            best_move = moves[scores.index(best)]
+        if self.table is not None:
+            self.table.store(state.hash ^ SIDE_KEYS[color], 1, to_table(best, ply), EXACT, best_move)
+        return best
+
+    def order(self, moves, ply, table_move = None):
+        """ Winning climbs first, then the table's best move, then killer moves,
+            then by history score.
+        """
+        state = self.state
+        killers = self.killers[ply]
+        history = self.history
+
+        def key(move):
+            if state.height(move.end) == 3:
+                return 1 << 40
+            if move == table_move:
+                return 1 << 35
+            if move == killers[0] or move == killers[1]:
+                return 1 << 30
+            return history.get((move.worker, move.end, move.build), 0)
+
+        return sorted(moves, key = key, reverse = True)
+
+    def store_cutoff(self, move, depth, ply):
+        killers = self.killers[ply]
+        if move != killers[0]:
+            killers[1] = killers[0]
+            killers[0] = move
+        key = (move.worker, move.end, move.build)
+        self.history[key] = self.history.get(key, 0) + depth * depth
@@ -0,0 +1,278 @@
+""" Asyncio game server.
+
+Hosts many Santorini games in one process, one game per connection, over a
+line-based protocol on TCP or a Unix socket. Search and mcts moves are
+computed in a process pool so a long search never blocks the event loop;
+random and heuristic moves are cheap and are played in the loop.
+
+    python3 server.py --port 4000 --workers 4
+    python3 server.py --unix /tmp/santorini.sock
+
+Protocol (one command or event per line, words separated by spaces):
+
+    server  hello santorini
+    client  new <white type> <blue type>     start a game, ie: new human search
+    server  game <white type> <blue type>
+    server  move <color> <worker> <direction> <build direction>
+                                             every move played, ie: move white A ne sw
+    server  turn <color>                     a human player is to move
+    client  move <worker> <direction> <build direction>
+    client  board
+    server  board <cell>,<cell>,...          25 cells by row, height then worker, ie: 0,1Y,...
+    server  over <color>                     the winning color
+    server  error <message>                  the command was refused
+    client  quit
+"""
+import random
+import asyncio
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from engine import CELLS, CELL_DIRECTIONS, DIRECTION_CELLS, Move, WORKERS, WORKER_INDEX, legal_actions
+from main import Santorini, WhitePlayer, BluePlayer, COLOR_INDEX, DEFAULT_AI_OPTIONS, PLAYER_TYPES
+
+# player types whose moves are computed in the process pool
+POOL_PLAYER_TYPES = ["search", "mcts"]
+# pending connections; asyncio's default of 100 stalls clients that connect in bursts
+BACKLOG = 1024
+
+
+def new_game(white_type, blue_type, rng = None, ai_options = None):
+    white = WhitePlayer(white_type, score_display = "off")
+    blue = BluePlayer(blue_type, score_display = "off")
+    game = Santorini(white, blue, undo_redo = "off", score_display = "off", render = "none", rng = rng, ai_options = ai_options)
+    game.set_up_board()
+    return game
+
+
+def players(game):
+    """ (player, opponent) for the side to move. """
+    if game.turn_num % 2 == 1:
+        return game.white, game.blue
+    return game.blue, game.white
+
+
+def computer_move(game):
+    """ Plays the computer player's turn and returns the Move it chose. """
+    player, opponent = players(game)
+    game.take_turn(player, opponent)
+    return game.last_move
+
+
+# AIs a pool process keeps between moves, by (white type, blue type), so a
+# search player's transposition table is allocated once per process
+_pool_ais = {}
+
+
+def pool_move(state, turn_num, white_type, blue_type, seed, ai_options):
+    """ computer_move on a fresh game laid over state, for the process pool. """
+    game = new_game(white_type, blue_type, random.Random(seed), ai_options)
+    game.set_up_board(state)
+    game.turn_num = turn_num
+    game.ais = _pool_ais.setdefault((white_type, blue_type), {})
+    return computer_move(game)
+
+
+def format_move(move):
+    return f"{WORKERS[move.worker]} {CELL_DIRECTIONS[move.start][move.end]} {CELL_DIRECTIONS[move.end][move.build]}"
+
+
+def parse_move(words, game, player):
+    """ The legal Move for "A ne sw" by player; raises ValueError otherwise. """
+    if len(words) != 3:
+        raise ValueError("expected: move <worker> <direction> <build direction>")
+    worker, direction, build = words[0].upper(), words[1], words[2]
+    if worker not in player.workers:
+        raise ValueError(f"{worker} is not your worker")
+    start = game.state.workers[WORKER_INDEX[worker]]
+    end = DIRECTION_CELLS[start].get(direction)
+    if end is None:
+        raise ValueError(f"cannot move {direction}")
+    build_cell = DIRECTION_CELLS[end].get(build)
+    if build_cell is None:
+        raise ValueError(f"cannot build {build}")
+    move = Move(WORKER_INDEX[worker], start, end, build_cell)
+    if move not in legal_actions(game.state, COLOR_INDEX[player.color]):
+        raise ValueError(f"{worker} cannot move {direction} and build {build}")
+    return move
+
+
+def board_line(game):
+    state = game.state
+    cells = []
+    for cell in range(CELLS):
+        worker = state.worker_at(cell)
+        cells.append(f"{state.height(cell)}{worker or ''}")
+    return "board " + ",".join(cells)
+
+
+class Session():
+    """ One connection and the game it plays. """
+    __slots__ = ("server", "reader", "writer", "game")
+
+    def __init__(self, server, reader, writer):
+        self.server = server
+        self.reader = reader
+        self.writer = writer
+        self.game = None
+
+    def send(self, line):
+        self.writer.write(line.encode() + b"\n")
+
+    async def run(self):
+        self.send("hello santorini")
+        while True:
+            await self.writer.drain()
+            try:
+                line = await self.reader.readline()
+            except ValueError:
+                # readline raises ValueError for a line longer than the stream's limit
+                self.send("error line too long")
+                await self.writer.drain()
+                break
+            if not line:
+                break
+            words = line.decode(errors = "replace").split()
+            if not words:
+                continue
+            command, words = words[0].lower(), words[1:]
+            if command == "quit":
+                break
+            try:
+                if command == "new":
+                    await self.start(words)
+                elif command == "move":
+                    await self.human_move(words)
+                elif command == "board":
+                    if self.game is None:
+                        raise ValueError("no game")
+                    self.send(board_line(self.game))
+                else:
+                    raise ValueError(f"unknown command {command}")
+            except ValueError as error:
+                self.send(f"error {error}")
+
+    async def start(self, words):
+        if len(words) != 2 or words[0] not in PLAYER_TYPES or words[1] not in PLAYER_TYPES:
+            raise ValueError(f"expected: new <white type> <blue type>, types {', '.join(PLAYER_TYPES)}")
+        # games played in the loop share the global random module; a Random per game costs 2.5KB
+        self.game = new_game(words[0], words[1], ai_options = self.server.ai_options)
+        self.server.games_started += 1
+        self.send(f"game {words[0]} {words[1]}")
+        await self.advance()
+
+    async def human_move(self, words):
+        game = self.game
+        if game is None or game.win_state:
+            raise ValueError("no game in progress")
+        player, _ = players(game)
+        if player.player_type != "human":
+            raise ValueError(f"{player.color} is not a human player")
+        self.play(parse_move(words, game, player))
+        await self.advance()
+
+    def play(self, move):
+        """ Plays a Move chosen by a human or in the pool. """
+        game = self.game
+        player, _ = players(game)
+        game.make_move(move)
+        if game.game_over(player):
+            game.win_state = True
+            game.win_color = player.color
+        self.send(f"move {player.color} {format_move(move)}")
+
+    async def advance(self):
+        """ Plays computer turns until a human is to move or the game ends. """
+        game = self.game
+        while True:
+            player, _ = players(game)
+            if not game.win_state:
+                game.no_possible_moves(player)
+            if game.win_state:
+                break
+            if player.player_type == "human":
+                self.send(f"turn {player.color}")
+                return
+            if player.player_type in POOL_PLAYER_TYPES:
+                self.play(await self.server.pool_move(game))
+            else:
+                move = computer_move(game)
+                self.send(f"move {player.color} {format_move(move)}")
+        self.server.games_finished += 1
+        self.send(f"over {game.win_color}")
+
+
+class GameServer():
+    def __init__(self, workers = 1, ai_options = None, seed = None):
+        """ Args:
+                workers (int): Processes computing search and mcts moves.
+                ai_options (dict): Settings for computer players, see DEFAULT_AI_OPTIONS.
+                seed (int): Seed for the games' random number generators, None for a random one.
+        """
+        # every move runs in its own pool call, so mcts must not start a pool of its own
+        self.ai_options = dict(DEFAULT_AI_OPTIONS, **(ai_options or {}), mcts_workers = 1)
+        # forked workers would inherit every client socket open at the time and
+        # keep it from closing, so they start from a clean forkserver process
+        self.pool = ProcessPoolExecutor(workers, mp_context = multiprocessing.get_context("forkserver"))
+        self.rng = random.Random(seed)
+        self.sessions = set()
+        self.games_started = 0
+        self.games_finished = 0
+
+    def next_seed(self):
+        return self.rng.getrandbits(64)
+
+    async def pool_move(self, game):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.pool, pool_move, game.state, game.turn_num, game.white.player_type, game.blue.player_type, self.next_seed(), self.ai_options)
+
+    async def handle(self, reader, writer):
+        session = Session(self, reader, writer)
+        self.sessions.add(session)
+        try:
+            await session.run()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.sessions.discard(session)
+            writer.close()
+
+    async def start(self, host = "127.0.0.1", port = 4000, unix = None, backlog = BACKLOG):
+        """ Starts listening and returns the asyncio server. """
+        if unix is not None:
+            return await asyncio.start_unix_server(self.handle, path = unix, backlog = backlog)
+        return await asyncio.start_server(self.handle, host, port, backlog = backlog)
+
+    def close(self):
+        self.pool.shutdown()
+
+
+async def serve(host, port, unix, workers, ai_options):
+    game_server = GameServer(workers, ai_options)
+    server = await game_server.start(host, port, unix)
+    print(f"serving on {unix or f'{host}:{port}'}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        game_server.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Host Santorini games over a line protocol', prog = 'server.py')
+    parser.add_argument('--host', type = str, default = '127.0.0.1', help='address to listen on')
+    parser.add_argument('--port', type = int, default = 4000, help='TCP port to listen on')
+    parser.add_argument('--unix', type = str, default = None, help='listen on this Unix socket instead of TCP')
+    parser.add_argument('--workers', type = int, default = 1, help='processes computing search and mcts moves')
+    parser.add_argument('--search-time', type = float, default = 1.0, help='seconds per move for the search player')
+    parser.add_argument('--search-depth', type = int, default = None, help='deepest search in plies')
+    parser.add_argument('--mcts-playouts', type = int, default = 2000, help='playouts per move for the mcts player')
+    parser.add_argument('--book', type = str, default = None, help='opening book and tablebase file for the computer players')
+    args = parser.parse_args()
+
+    ai_options = {"search_time": args.search_time, "search_depth": args.search_depth, "mcts_playouts": args.mcts_playouts, "book": args.book}
+    try:
+        asyncio.run(serve(args.host, args.port, args.unix, args.workers, ai_options))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,156 @@
+""" Headless self-play runner.
+
+Plays computer-vs-computer games without printing boards or reading input and
+returns the results, optionally spreading the games over a process pool.
+
+    python3 simulate.py random heuristic --games 1000 --seed 0 --workers 4
+"""
+import time
+import random
+import argparse
+from collections import namedtuple
+from multiprocessing import Pool, cpu_count
+
+from engine import WEIGHTS
+from main import Santorini, WhitePlayer, BluePlayer, DEFAULT_AI_OPTIONS, parse_weights
+from records import GameRecord, RecordWriter, encode_moves
+
+AI_PLAYER_TYPES = ["random", "heuristic", "search", "mcts"]
+
+# search and mcts players default to fixed budgets with no clock and run in the
+# game's own process, so batches stay reproducible
+SIMULATE_AI_OPTIONS = dict(DEFAULT_AI_OPTIONS, search_time = None, search_depth = 2, mcts_playouts = 200, mcts_time = None, mcts_workers = 1)
+
+# moves is the game in the binary ply format of records.py
+GameResult = namedtuple("GameResult", ["seed", "winner", "plies", "moves"])
+
+
+def play_game(white_type, blue_type, seed, ai_options = None):
+    """ Plays one headless game.
+        Args:
+            white_type (string): Player type for white, ie: "random"
+            blue_type (string): Player type for blue.
+            seed (int): Seed for the game's random number generator.
+            ai_options (dict): Settings for search and mcts players, see
+                DEFAULT_AI_OPTIONS. Missing keys come from SIMULATE_AI_OPTIONS.
+        Return:
+            (GameResult) : The winning color, the number of plies played and
+            the encoded moves.
+    """
+    white = WhitePlayer(white_type, score_display = "off")
+    blue = BluePlayer(blue_type, score_display = "off")
+    game = Santorini(white, blue, undo_redo = "off", score_display = "off", render = "none", rng = random.Random(seed), ai_options = dict(SIMULATE_AI_OPTIONS, **(ai_options or {})))
+    game.set_up_board()
+    moves = []
+    while not game.win_state:
+        if game.turn_num % 2 == 1:
+            over = game.take_turn(white, blue)
+        else:
+            over = game.take_turn(blue, white)
+        if over != "over":
+            moves.append(game.last_move)
+    game.close_ais()
+    return GameResult(seed, game.win_color, len(moves), encode_moves(moves))
+
+
+def _play_game(args):
+    return play_game(*args)
+
+
+def game_seeds(seed, n_games):
+    """ Per-game seeds drawn up front so a game's result only depends on its index. """
+    rng = random.Random(seed)
+    return [rng.getrandbits(64) for _ in range(n_games)]
+
+
+def iter_simulate(white, blue, n_games, seed = 0, workers = 1, ai_options = None):
+    """ Like simulate, but yields each GameResult as soon as it and every game
+        before it are done.
+    """
+    for player_type in (white, blue):
+        if player_type not in AI_PLAYER_TYPES:
+            raise ValueError(f"{player_type} is not a computer player type")
+
+    jobs = [(white, blue, game_seed, ai_options) for game_seed in game_seeds(seed, n_games)]
+    if workers is None:
+        workers = cpu_count()
+    if workers <= 1:
+        for job in jobs:
+            yield _play_game(job)
+        return
+
+    chunksize = max(1, min(64, n_games // (workers * 8)))
+    with Pool(workers) as pool:
+        yield from pool.imap(_play_game, jobs, chunksize = chunksize)
+
+
+def simulate(white, blue, n_games, seed = 0, workers = 1, ai_options = None):
+    """ Plays n_games between two computer player types.
+        Args:
+            white (string): Player type for white.
+            blue (string): Player type for blue.
+            n_games (int): Number of games to play.
+            seed (int): Master seed, the same seed gives the same games for any
+                number of workers.
+            workers (int): Number of processes, None for one per core.
+            ai_options (dict): Settings for search and mcts players. A time
+                limit makes their games depend on machine speed.
+        Return:
+            (list) : A GameResult per game, in game order.
+    """
+    return list(iter_simulate(white, blue, n_games, seed, workers, ai_options))
+
+
+def summarize(results, elapsed):
+    """ Win rates, game lengths and throughput for a batch of results. """
+    n_games = len(results)
+    plies = [result.plies for result in results]
+    white_wins = sum(1 for result in results if result.winner == "white")
+    return {
+        "games": n_games,
+        "white_wins": white_wins,
+        "blue_wins": n_games - white_wins,
+        "white_win_rate": white_wins / n_games if n_games else 0.0,
+        "blue_win_rate": (n_games - white_wins) / n_games if n_games else 0.0,
+        "mean_plies": sum(plies) / n_games if n_games else 0.0,
+        "min_plies": min(plies, default = 0),
+        "max_plies": max(plies, default = 0),
+        "seconds": elapsed,
+        "games_per_sec": n_games / elapsed if elapsed > 0 else 0.0,
+    }
+
+
+def print_summary(white, blue, summary):
+    print(f"white ({white}) vs blue ({blue}): {summary['games']} games in {summary['seconds']:.2f}s, {summary['games_per_sec']:.1f} games/sec")
+    print(f"white wins: {summary['white_wins']} ({summary['white_win_rate']:.1%})")
+    print(f"blue wins: {summary['blue_wins']} ({summary['blue_win_rate']:.1%})")
+    print(f"game length (plies): mean {summary['mean_plies']:.1f}, min {summary['min_plies']}, max {summary['max_plies']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Run headless Santorini self-play', prog = 'simulate.py')
+    parser.add_argument('white_player_type', nargs = '?', type = str, default = "random", help='Player type for White player', choices = AI_PLAYER_TYPES)
+    parser.add_argument('blue_player_type', nargs = '?', type = str, default = "heuristic", help='Player type for Blue player', choices = AI_PLAYER_TYPES)
+    parser.add_argument('--games', type = int, default = 100, help='number of games to play')
+    parser.add_argument('--seed', type = int, default = 0, help='master seed for the batch')
+    parser.add_argument('--workers', type = int, default = None, help='number of processes (default: one per core)')
+    parser.add_argument('--search-time', type = float, default = None, help='seconds per move for search players (default: no limit)')
+    parser.add_argument('--search-depth', type = int, default = SIMULATE_AI_OPTIONS["search_depth"], help='deepest search in plies for search players')
+    parser.add_argument('--mcts-playouts', type = int, default = SIMULATE_AI_OPTIONS["mcts_playouts"], help='playouts per move for mcts players')
+    parser.add_argument('--book', type = str, default = None, help='opening book and tablebase file for the computer players')
+    parser.add_argument('--weights', type = parse_weights, default = WEIGHTS, help='c1,c2,c3 weights for the heuristic and search players')
+    parser.add_argument('--evaluator', type = str, default = None, help='evaluator for the heuristic and search players: "heuristic" or a model file')
+    parser.add_argument('--record', type = str, default = None, help='append the games to this binary record file')
+    args = parser.parse_args()
+
+    ai_options = {"search_time": args.search_time, "search_depth": args.search_depth, "mcts_playouts": args.mcts_playouts, "book": args.book, "evaluator": args.evaluator, "weights": args.weights}
+    writer = RecordWriter(args.record) if args.record else None
+    start = time.perf_counter()
+    results = []
+    for result in iter_simulate(args.white_player_type, args.blue_player_type, args.games, seed = args.seed, workers = args.workers, ai_options = ai_options):
+        if writer is not None:
+            writer.write(GameRecord(args.white_player_type, args.blue_player_type, result.seed, result.winner, result.moves))
+        results.append(result)
+    if writer is not None:
+        writer.close()
+    print_summary(args.white_player_type, args.blue_player_type, summarize(results, time.perf_counter() - start))
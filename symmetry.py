@@ -0,0 +1,159 @@
+""" Board symmetries: canonical positions and symmetric move dedup.
+
+The 5x5 board has 8 symmetries (4 rotations and 4 reflections), and swapping
+the two workers of a color never changes the game either, so a position has
+up to 32 equivalent forms. canonical picks one of them: the board symmetry
+whose transformed levels and worker cells (each color's pair sorted) pack to
+the smallest int. The opening book keys positions by the canonical form's
+hash and stores moves with map_move, so it holds each position once.
+
+Masks are transformed with precomputed tables, five lookups (one per row) per
+mask. unique_actions drops moves that a symmetry of the position itself maps
+onto an earlier move, which shrinks root move lists: the start position has
+4 symmetries and 80 moves but only 21 distinct ones.
+"""
+from engine import CELLS, POSITIONS, SIZE, GameState, Move, legal_actions
+
+LAST = SIZE - 1
+
+# each symmetry maps (row, col) to a new (row, col)
+SYMMETRY_NAMES = ["identity", "rotate 90", "rotate 180", "rotate 270", "flip rows", "flip columns", "transpose", "anti-transpose"]
+_MAPS = [
+    lambda r, c: (r, c),
+    lambda r, c: (c, LAST - r),
+    lambda r, c: (LAST - r, LAST - c),
+    lambda r, c: (LAST - c, r),
+    lambda r, c: (LAST - r, c),
+    lambda r, c: (r, LAST - c),
+    lambda r, c: (c, r),
+    lambda r, c: (LAST - c, LAST - r),
+]
+
+# PERMUTATIONS[s][cell] is the cell that symmetry s moves cell to
+PERMUTATIONS = [tuple(SIZE * mapped[0] + mapped[1] for mapped in (f(*POSITIONS[cell]) for cell in range(CELLS))) for f in _MAPS]
+INVERSES = [tuple(permutation.index(cell) for cell in range(CELLS)) for permutation in PERMUTATIONS]
+SYMMETRIES = range(len(PERMUTATIONS))
+
+
+def _row_tables(permutation):
+    """ tables[row][bits] is the transformed mask of the five bits of one row. """
+    tables = []
+    for row in range(SIZE):
+        table = []
+        for row_bits in range(1 << SIZE):
+            mask = 0
+            for col in range(SIZE):
+                if row_bits >> col & 1:
+                    mask |= 1 << permutation[row * SIZE + col]
+            table.append(mask)
+        tables.append(table)
+    return tables
+
+ROW_TABLES = [_row_tables(permutation) for permutation in PERMUTATIONS]
+ROW_MASK = (1 << SIZE) - 1
+
+
+def transform_mask(mask, symmetry):
+    t0, t1, t2, t3, t4 = ROW_TABLES[symmetry]
+    return t0[mask & ROW_MASK] | t1[mask >> 5 & ROW_MASK] | t2[mask >> 10 & ROW_MASK] | t3[mask >> 15 & ROW_MASK] | t4[mask >> 20]
+
+
+def _pack(levels, workers):
+    """ An int holding levels and worker cells, each color's pair sorted. """
+    a, b, y, z = workers
+    if a > b:
+        a, b = b, a
+    if y > z:
+        y, z = z, y
+    return (((((levels[3] << 25 | levels[2]) << 25 | levels[1]) << 25 | levels[0]) << 5 | a) << 5 | b) << 10 | y << 5 | z
+
+
+def _canonical_symmetry(state):
+    """ (packed form, symmetry) of the smallest transformed form of state. """
+    levels = state.levels
+    workers = state.workers
+    best = None
+    for symmetry in SYMMETRIES:
+        permutation = PERMUTATIONS[symmetry]
+        packed = _pack([transform_mask(level, symmetry) for level in levels], [permutation[cell] for cell in workers])
+        if best is None or packed < best[0]:
+            best = (packed, symmetry)
+    return best
+
+
+def transform(state, symmetry):
+    """ A new GameState with every cell moved by symmetry; workers keep their indices. """
+    permutation = PERMUTATIONS[symmetry]
+    transformed = GameState()
+    for index, cell in enumerate(state.workers):
+        transformed.place(index, permutation[cell])
+    for cell in range(CELLS):
+        for _ in range(state.height(cell)):
+            transformed.build(permutation[cell])
+    return transformed
+
+
+def canonical(state):
+    """ Return:
+            (tuple) : The canonical GameState, with each color's workers in
+            cell order, and the symmetry that maps state onto it.
+    """
+    symmetry = _canonical_symmetry(state)[1]
+    transformed = transform(state, symmetry)
+    result = GameState()
+    workers = transformed.workers
+    for first in (0, 2):
+        low, high = sorted(workers[first:first + 2])
+        result.place(first, low)
+        result.place(first + 1, high)
+    result.levels = transformed.levels
+    result.hash = result.zobrist()
+    return result, symmetry
+
+
+def map_move(move, symmetry, target):
+    """ move with its cells moved by symmetry, as a Move in target, the
+        transformed position. canonical's symmetry takes moves to the canonical
+        position and inverse_symmetry of it brings them back.
+    """
+    permutation = PERMUTATIONS[symmetry]
+    start = permutation[move.start]
+    return Move(target.workers.index(start), start, permutation[move.end], permutation[move.build])
+
+
+def inverse_symmetry(symmetry):
+    return PERMUTATIONS.index(INVERSES[symmetry])
+
+
+def stabilizer(state):
+    """ The symmetries that map state onto itself, up to swapping a color's workers. """
+    levels = state.levels
+    workers = state.workers
+    own = _pack(levels, workers)
+    symmetries = []
+    for symmetry in SYMMETRIES:
+        permutation = PERMUTATIONS[symmetry]
+        if _pack([transform_mask(level, symmetry) for level in levels], [permutation[cell] for cell in workers]) == own:
+            symmetries.append(symmetry)
+    return symmetries
+
+
+def unique_actions(state, color):
+    """ The legal Moves of color with one move kept from each set of moves
+        that a symmetry of the position maps onto each other, in
+        legal_actions order.
+    """
+    moves = list(legal_actions(state, color))
+    symmetries = stabilizer(state)
+    if len(symmetries) == 1:
+        return moves
+    permutations = [PERMUTATIONS[symmetry] for symmetry in symmetries]
+    seen = set()
+    unique = []
+    for move in moves:
+        key = min((p[move.start], p[move.end], p[move.build]) for p in permutations)
+        if key not in seen:
+            seen.add(key)
+            unique.append(move)
+    return unique
+
@@ -0,0 +1,37 @@
+""" The NumPy batch evaluator against the Python move generator and scoring loop. """
+import pytest
+
+from engine import WORKERS, legal_actions, to_cell
+from main import Santorini, WhitePlayer, BluePlayer
+from benchmarks.positions import random_positions
+
+np = pytest.importorskip("numpy")
+batch_eval = pytest.importorskip("batch_eval")
+
+
+def encoded(positions):
+    return batch_eval.encode([state for state, _ in positions], [color for _, color in positions])
+
+
+def test_actions_match_legal_actions():
+    positions = random_positions(300, 11)
+    heights, workers, colors = encoded(positions)
+    batch = batch_eval.evaluate_actions(heights, workers, colors)
+    for index, (state, color) in enumerate(positions):
+        rows = np.nonzero(batch.position == index)[0]
+        vectorized = [(int(batch.worker[row]), int(batch.start[row]), int(batch.end[row]), int(batch.build[row])) for row in rows]
+        assert vectorized == [tuple(move) for move in legal_actions(state, color)]
+
+
+def test_scores_match_heuristic_scores():
+    positions = random_positions(300, 12)
+    heights, workers, colors = encoded(positions)
+    scores, legal, target = batch_eval.move_scores(heights, workers, colors)
+    for index, (state, color) in enumerate(positions):
+        game = Santorini(WhitePlayer("heuristic", "off"), BluePlayer("heuristic", "off"), undo_redo = "off", score_display = "off", render = "none")
+        game.set_up_board(state)
+        player, opponent = (game.white, game.blue) if color == 0 else (game.blue, game.white)
+        expected = [(move[0], to_cell(move[2]), float(move[3])) for move in game.heuristic_scores(player, opponent)]
+        slot, direction = np.nonzero(legal[index])
+        vectorized = [(WORKERS[2 * color + s], int(target[index, s, d]), float(scores[index, s, d])) for s, d in zip(slot, direction)]
+        assert vectorized == expected
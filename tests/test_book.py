@@ -0,0 +1,39 @@
+""" Book files and which players take their replies. """
+from book import OPENING, TABLEBASE, Book, pack, position_key, write_book
+from engine import GameState, legal_actions
+from main import BluePlayer, Santorini, WhitePlayer
+from symmetry import map_move
+
+
+def book_game(path, **ai_options):
+    game = Santorini(WhitePlayer("heuristic", "off"), BluePlayer("heuristic", "off"), undo_redo = "off", score_display = "off",
+                     render = "none", ai_options = dict(book = path, **ai_options))
+    game.set_up_board()
+    return game
+
+
+def write_entry(path, kind, weights):
+    state = GameState.start()
+    move = list(legal_actions(state, 0))[5]
+    key, form, symmetry = position_key(state, 0)
+    write_book(path, {key: pack(map_move(move, symmetry, form), kind, 2, 3)}, weights)
+    return move
+
+
+def test_book_keeps_its_weights(tmp_path):
+    path = str(tmp_path / "weights.book")
+    write_entry(path, OPENING, (5, 2, -1))
+    assert Book(path).weights == (5, 2, -1)
+
+
+def test_opening_replies_need_the_book_weights(tmp_path):
+    path = str(tmp_path / "opening.book")
+    move = write_entry(path, OPENING, (5, 2, 1))
+    assert book_game(path, weights = (5, 2, 1)).book_entry(WhitePlayer("heuristic", "off")) == (move, OPENING, 2, 3)
+    assert book_game(path).book_entry(WhitePlayer("heuristic", "off")) is None
+
+
+def test_tablebase_results_hold_for_any_weights(tmp_path):
+    path = str(tmp_path / "tablebase.book")
+    move = write_entry(path, TABLEBASE, (5, 2, 1))
+    assert book_game(path).book_entry(WhitePlayer("heuristic", "off")) == (move, TABLEBASE, 2, 3)
@@ -0,0 +1,87 @@
+""" Move generation against REFERENCE_COUNTS and a standalone rules walk. """
+import perft
+
+SIZE = 5
+STEPS = [(1, 0), (1, 1), (1, -1), (0, -1), (0, 1), (-1, 0), (-1, -1), (-1, 1)]
+
+
+class Slot():
+    """ One cell of the original board: a height, a worker and its neighbors. """
+    def __init__(self, position):
+        self.position = position
+        self.curr_worker = None
+        self.curr_height = 0
+        self.possibleMoves = [(position[0] + row, position[1] + col) for row, col in STEPS
+                              if 0 <= position[0] + row < SIZE and 0 <= position[1] + col < SIZE]
+
+
+def slot_board(state):
+    """ A Slot grid copied cell by cell from a GameState, and the worker positions. """
+    board = [[Slot((row, col)) for col in range(SIZE)] for row in range(SIZE)]
+    for row in range(SIZE):
+        for col in range(SIZE):
+            board[row][col].curr_height = state.height(row * SIZE + col)
+    positions = [divmod(cell, SIZE) for cell in state.workers]
+    for worker, (row, col) in enumerate(positions):
+        board[row][col].curr_worker = worker
+    return board, positions
+
+
+def valid_moves(board, position, build = False):
+    """ The baseline's valid_move: free neighbors, climbing at most one level, never onto a dome. """
+    here = board[position[0]][position[1]].curr_height
+    valid = []
+    for row, col in board[position[0]][position[1]].possibleMoves:
+        slot = board[row][col]
+        if slot.curr_worker is not None:
+            continue
+        if slot.curr_height == 4 or (not build and here + 1 < slot.curr_height):
+            continue
+        valid.append((row, col))
+    return valid
+
+
+def slot_perft(board, positions, color, depth):
+    if depth == 0:
+        return 1
+    nodes = 0
+    for worker in (2 * color, 2 * color + 1):
+        start = positions[worker]
+        for end in valid_moves(board, start):
+            board[start[0]][start[1]].curr_worker = None
+            board[end[0]][end[1]].curr_worker = worker
+            positions[worker] = end
+            for build in valid_moves(board, end, build = True):
+                if depth == 1:
+                    nodes += 1
+                elif board[end[0]][end[1]].curr_height != 3:
+                    board[build[0]][build[1]].curr_height += 1
+                    nodes += slot_perft(board, positions, 1 - color, depth - 1)
+                    board[build[0]][build[1]].curr_height -= 1
+            positions[worker] = start
+            board[end[0]][end[1]].curr_worker = None
+            board[start[0]][start[1]].curr_worker = worker
+    return nodes
+
+
+def test_perft_reference_counts():
+    assert perft.check(max_depth = 2) == []
+
+
+def test_slot_rules_reproduce_reference_counts():
+    def counter(state, color, depth):
+        board, positions = slot_board(state)
+        return slot_perft(board, positions, color, depth)
+    assert perft.check(counter, max_depth = 2) == []
+
+
+def test_perft_matches_slot_rules_by_root_action():
+    for moves, _ in perft.REFERENCE_COUNTS[1:]:
+        state, color = perft.position_after(moves)
+        for move, count in perft.divide(state, color, 2).items():
+            child, _ = perft.position_after(moves + [move])
+            if child.height(child.workers[perft.WORKER_INDEX[move[0]]]) == 3:
+                assert count == 0
+            else:
+                board, positions = slot_board(child)
+                assert count == slot_perft(board, positions, 1 - color, 1)
@@ -0,0 +1,36 @@
+""" Writing seeded games to a record file and reading them back. """
+from engine import GameState, legal_actions
+from records import GameRecord, RecordWriter, decode_move, encode_move, read_records, replay
+from simulate import game_seeds, play_game
+
+MATCHUPS = [("random", "random"), ("random", "heuristic"), ("heuristic", "random"), ("heuristic", "heuristic")]
+
+
+def test_records_round_trip(tmp_path):
+    path = str(tmp_path / "games.rec")
+    written = []
+    for white, blue in MATCHUPS:
+        for seed in game_seeds(3, 3):
+            result = play_game(white, blue, seed)
+            written.append(GameRecord(white, blue, result.seed, result.winner, result.moves))
+    # the second writer appends to the file without a second header
+    with RecordWriter(path) as writer:
+        for record in written[:5]:
+            writer.write(record)
+    with RecordWriter(path) as writer:
+        for record in written[5:]:
+            writer.write(record)
+
+    read = list(read_records(path))
+    assert read == written
+    for record in read:
+        state = GameState.start()
+        for ply, byte in enumerate(record.moves):
+            move = decode_move(byte, state, ply % 2)
+            assert move in legal_actions(state, ply % 2)
+            assert encode_move(move) == byte
+            state.make(move)
+        game = replay(record)
+        assert game.win_color == record.winner
+        assert (game.state.levels, game.state.workers, game.state.hash) == (state.levels, state.workers, state.hash)
+        assert game.turn_num == len(record.moves) + 1
@@ -0,0 +1,31 @@
+""" Seeded games against the moves the original Slot-based game printed for the same seeds. """
+import pytest
+
+from engine import GameState
+from perft import format_move
+from records import decode_move
+from simulate import play_game
+
+# (white, blue, seed, moves, winner), taken from main.py output before the bitboard engine
+RECORDED_GAMES = [
+    ("random", "heuristic", 3, ["A,sw,n", "Z,nw,n", "A,ne,s", "Y,e,w", "A,se,nw", "Z,sw,e", "A,e,e", "Z,e,nw", "A,w,e",
+                                "Z,w,w", "A,n,e", "Z,n,nw", "B,e,nw", "Z,sw,se", "B,s,s", "Z,se,nw", "A,w,nw", "Z,nw,n"], "blue"),
+    ("heuristic", "random", 1, ["A,ne,n", "Y,w,s", "B,w,ne", "Z,w,nw", "B,sw,sw", "Y,ne,s", "A,nw,e", "Y,e,e", "A,e,ne",
+                                "Y,w,s", "A,ne,s"], "white"),
+    ("heuristic", "heuristic", 5, ["B,sw,e", "Z,n,ne", "A,n,se", "Y,e,e", "A,se,sw", "Y,e,w", "B,n,nw", "Y,sw,ne", "B,e,se",
+                                   "Y,n,n", "A,n,se", "Z,sw,se", "A,se,se", "Z,ne,sw", "A,w,s", "Z,s,se", "B,s,w", "Y,e,w",
+                                   "B,nw,se", "Z,n,se", "A,n,w", "Z,sw,s", "B,se,nw", "Y,w,w"], "blue"),
+]
+
+
+@pytest.mark.parametrize("white, blue, seed, moves, winner", RECORDED_GAMES)
+def test_seeded_game_replays_recorded_moves(white, blue, seed, moves, winner):
+    result = play_game(white, blue, seed)
+    state = GameState.start()
+    played = []
+    for ply, byte in enumerate(result.moves):
+        move = decode_move(byte, state, ply % 2)
+        played.append(format_move(move))
+        state.make(move)
+    assert played == moves
+    assert result.winner == winner
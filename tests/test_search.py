@@ -0,0 +1,32 @@
+""" The search player's time budget, with and without an evaluator. """
+import time
+
+import pytest
+
+from engine import GameState
+from evaluator import HeuristicEvaluator
+from search import Searcher
+
+BUDGET = 0.1
+
+
+def timed_search(evaluator):
+    searcher = Searcher(BUDGET, evaluator = evaluator)
+    start = time.perf_counter()
+    searcher.best_move(GameState.start(), 0)
+    return time.perf_counter() - start
+
+
+def test_search_keeps_to_budget():
+    assert timed_search(None) < 3 * BUDGET
+
+
+def test_heuristic_evaluator_search_keeps_to_budget():
+    assert timed_search(HeuristicEvaluator()) < 3 * BUDGET
+
+
+def test_learned_evaluator_search_keeps_to_budget():
+    np = pytest.importorskip("numpy")
+    from learned import N_FEATURES, LinearEvaluator
+    model = LinearEvaluator(np.random.default_rng(0).normal(0, 0.1, N_FEATURES), 0.0)
+    assert timed_search(model) < 3 * BUDGET
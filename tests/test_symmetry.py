@@ -0,0 +1,75 @@
+""" Canonical forms, move mapping and root move dedup under the board's symmetries. """
+from benchmarks.positions import random_positions
+from book import Book, pack, position_key, write_book, OPENING
+from engine import GameState, legal_actions
+from symmetry import PERMUTATIONS, SYMMETRIES, canonical, inverse_symmetry, map_move, stabilizer, transform, unique_actions
+
+
+def swapped(state, color):
+    """ state with the two workers of color trading places. """
+    workers = list(state.workers)
+    workers[2 * color], workers[2 * color + 1] = workers[2 * color + 1], workers[2 * color]
+    result = GameState()
+    for index, cell in enumerate(workers):
+        result.place(index, cell)
+    result.levels = state.levels
+    result.hash = result.zobrist()
+    return result
+
+
+def form(state):
+    canonical_state = canonical(state)[0]
+    return canonical_state.levels, canonical_state.workers, canonical_state.hash
+
+
+def test_canonical_form_is_shared_by_symmetric_positions():
+    for state, color in random_positions(60, 5):
+        expected = form(state)
+        key = position_key(state, color)[0]
+        for symmetry in SYMMETRIES:
+            transformed = transform(state, symmetry)
+            assert form(transformed) == expected
+            assert position_key(transformed, color)[0] == key
+        for side in (0, 1):
+            assert form(swapped(state, side)) == expected
+        assert position_key(state, 1 - color)[0] != key
+
+
+def test_map_move_then_inverse_is_identity():
+    for state, color in random_positions(20, 6):
+        for symmetry in SYMMETRIES:
+            target = transform(state, symmetry)
+            back = inverse_symmetry(symmetry)
+            for move in legal_actions(state, color):
+                mapped = map_move(move, symmetry, target)
+                assert mapped in legal_actions(target, color)
+                assert map_move(mapped, back, state) == move
+
+
+def test_unique_actions_cover_every_legal_action():
+    positions = [(GameState.start(), 0)] + random_positions(40, 7)
+    for state, color in positions:
+        moves = list(legal_actions(state, color))
+        unique = unique_actions(state, color)
+        keys = {(move.start, move.end, move.build) for move in unique}
+        assert len(keys) == len(unique)
+        for move in moves:
+            assert any((PERMUTATIONS[symmetry][move.start], PERMUTATIONS[symmetry][move.end], PERMUTATIONS[symmetry][move.build]) in keys
+                       for symmetry in stabilizer(state))
+    start = GameState.start()
+    assert len(list(legal_actions(start, 0))) == 80
+    assert len(unique_actions(start, 0)) == 21
+
+
+def test_book_entry_is_found_from_every_symmetric_position(tmp_path):
+    state, color = random_positions(30, 8)[-1]
+    move = list(legal_actions(state, color))[0]
+    key, canonical_state, symmetry = position_key(state, color)
+    path = tmp_path / "symmetric.book"
+    write_book(str(path), {key: pack(map_move(move, symmetry, canonical_state), OPENING, 2, 7)})
+    book = Book(str(path))
+    for other in SYMMETRIES:
+        transformed = transform(state, other)
+        found, kind, depth, score = book.probe(transformed, color)
+        assert found == map_move(move, other, transformed)
+        assert (kind, depth, score) == (OPENING, 2, 7)
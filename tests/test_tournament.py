@@ -0,0 +1,42 @@
+""" Rating, SPRT and interval statistics of the tournament harness. """
+import pytest
+
+from tournament import elo_interval, expected_score, ratings, sprt_bounds, sprt_llr
+
+
+def test_equal_scores_give_equal_ratings():
+    records = {(0, 1): [10, 10], (0, 2): [7, 7], (1, 2): [12, 12]}
+    for elo, margin in ratings(3, records):
+        assert elo == pytest.approx(0, abs = 1e-6)
+        assert margin > 0
+    two = ratings(2, {(0, 1): [15, 15]})
+    assert two[0][0] == pytest.approx(two[1][0], abs = 1e-6)
+    assert two[0][1] == pytest.approx(two[1][1])
+
+
+def test_ratings_order_follows_results():
+    (strong, _), (middle, _), (weak, _) = ratings(3, {(0, 1): [30, 10], (1, 2): [30, 10], (0, 2): [35, 5]})
+    assert strong > middle > weak
+    assert strong + middle + weak == pytest.approx(0, abs = 1e-6)
+
+
+def test_sprt_llr_crosses_bounds_on_lopsided_results():
+    lower, upper = sprt_bounds(0.05, 0.05)
+    assert lower < 0 < upper
+    assert sprt_llr(0, 0, -30, 30) == 0
+    # the elo1 hypothesis (first entrant stronger) is accepted on a winning record
+    assert sprt_llr(80, 20, -30, 30) > upper
+    assert sprt_llr(20, 80, -30, 30) < lower
+    assert lower < sprt_llr(11, 10, -30, 30) < upper
+
+
+def test_interval_is_symmetric_at_even_score():
+    elo, margin = elo_interval(50, 50)
+    assert elo == pytest.approx(0, abs = 1e-9)
+    assert expected_score(elo - margin) == pytest.approx(1 - expected_score(elo + margin))
+    # more games narrow the interval, and it flips sign with the record
+    assert elo_interval(500, 500)[1] < margin
+    ahead, ahead_margin = elo_interval(60, 40)
+    behind, behind_margin = elo_interval(40, 60)
+    assert ahead == pytest.approx(-behind)
+    assert ahead_margin == pytest.approx(behind_margin)
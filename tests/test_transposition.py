@@ -0,0 +1,68 @@
+""" Incremental Zobrist hashing and the transposition table's packing and replacement. """
+import random
+
+from benchmarks.positions import random_positions
+from engine import CELLS, GameState, legal_actions
+from transposition import EXACT, LOWER, UPPER, TranspositionTable, decode_move, encode_move
+
+
+def test_incremental_hash_matches_zobrist():
+    rng = random.Random(4)
+    state = GameState.start()
+    played = []
+    color = 0
+    for _ in range(400):
+        moves = list(legal_actions(state, color))
+        if rng.random() < 0.3 and played:
+            state.unmake(played.pop())
+            color = 1 - color
+        elif rng.random() < 0.1:
+            state.set_height(rng.randrange(CELLS), rng.randrange(5))
+            # moves made before the edit cannot be taken back cleanly
+            played = []
+        elif moves:
+            move = rng.choice(moves)
+            state.make(move)
+            played.append(move)
+            color = 1 - color
+        assert state.hash == state.zobrist()
+
+
+def test_store_and_probe_round_trip():
+    table = TranspositionTable(1)
+    for index, (state, color) in enumerate(random_positions(50, 9)):
+        moves = list(legal_actions(state, color))
+        if not moves:
+            continue
+        move = moves[index % len(moves)]
+        key = state.hash ^ (color + 1) << 40
+        score = (index - 25) * 997
+        flag = (EXACT, LOWER, UPPER)[index % 3]
+        depth = index % 20
+        table.store(key, depth, score, flag, move)
+        assert table.probe(key) == (depth, score, flag, encode_move(move))
+        assert decode_move(table.probe(key)[3], state) == move
+    assert table.probe(12345) is None
+
+
+def test_replacement_and_generations():
+    # under a megabyte the table has a single slot, so every key collides
+    table = TranspositionTable(0)
+    table.store(1, 6, 10, EXACT)
+    table.store(2, 3, 20, EXACT)
+    assert table.probe(1) == (6, 10, EXACT, 0)
+    assert table.probe(2) is None
+    table.store(2, 6, 20, LOWER)
+    assert table.probe(2) == (6, 20, LOWER, 0)
+
+    # a later search replaces deeper entries from earlier ones
+    table.new_search()
+    table.store(3, 1, -5, UPPER)
+    assert table.probe(3) == (1, -5, UPPER, 0)
+
+    # storing without a move keeps the move already stored for the position
+    state = GameState.start()
+    move = list(legal_actions(state, 0))[0]
+    table.store(3, 2, 7, EXACT, move)
+    table.store(3, 4, 8, LOWER)
+    assert table.probe(3) == (4, 8, LOWER, encode_move(move))
@@ -0,0 +1,78 @@
+""" Undo and redo over Environment's move log. """
+import random
+
+from engine import legal_actions
+from main import Environment
+
+
+def new_environment():
+    environment = Environment("human", "human", undo_redo = "on", score_display = "off", render = "none")
+    environment.game.set_up_board()
+    return environment
+
+
+def play(environment, move):
+    """ Plays move as the turn of the side to move and logs it, as play() does. """
+    environment.game.last_move = move
+    environment.game.make_move(move)
+    environment.keep_history()
+
+
+def play_random(environment, plies, seed):
+    rng = random.Random(seed)
+    for _ in range(plies):
+        game = environment.game
+        play(environment, rng.choice(list(legal_actions(game.state, 1 - game.turn_num % 2))))
+
+
+def snapshot(environment):
+    game = environment.game
+    state = game.state
+    return state.levels, state.workers, state.hash, game.turn_num, game.win_state
+
+
+def test_undo_at_first_ply_does_nothing():
+    environment = new_environment()
+    before = snapshot(environment)
+    environment.undo()
+    assert snapshot(environment) == before
+    assert environment.history_index == 0
+
+
+def test_redo_past_the_end_does_nothing():
+    environment = new_environment()
+    play_random(environment, 4, 1)
+    before = snapshot(environment)
+    environment.redo()
+    assert snapshot(environment) == before
+    assert environment.history_index == 4
+
+
+def test_undo_then_redo_restores_state():
+    environment = new_environment()
+    played = []
+    rng = random.Random(2)
+    for _ in range(6):
+        played.append(snapshot(environment))
+        game = environment.game
+        play(environment, rng.choice(list(legal_actions(game.state, 1 - game.turn_num % 2))))
+    final = snapshot(environment)
+    for before in reversed(played):
+        environment.undo()
+        assert snapshot(environment) == before
+        assert environment.game.state.hash == environment.game.state.zobrist()
+    for _ in played:
+        environment.redo()
+    assert snapshot(environment) == final
+
+
+def test_new_move_after_undo_drops_redo_tail():
+    environment = new_environment()
+    play_random(environment, 5, 3)
+    environment.undo()
+    environment.undo()
+    play_random(environment, 1, 4)
+    assert environment.history_index == len(environment.history) == 4
+    before = snapshot(environment)
+    environment.redo()
+    assert snapshot(environment) == before
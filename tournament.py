@@ -0,0 +1,302 @@
+""" Round-robin tournaments between computer player configurations.
+
+An entrant is a player type with its own options, written
+
+    [name=]type[:option=value...]     ie: h521=heuristic:weights=5,2,1  search:search_depth=3
+
+Every pair of entrants plays games in rounds, alternating colors game by game,
+with all the games of a round spread over a process pool. After each round a
+sequential probability ratio test (SPRT) on the pairing's wins and losses
+decides whether the first entrant is stronger (Elo difference +bound) or
+weaker (-bound); a decided pairing plays no more games. Pairings that
+reach --max-games undecided are reported as such.
+
+Ratings are the maximum likelihood Elo ratings of all games (Bradley-Terry),
+centered on 0, with 95% confidence intervals from the Fisher information.
+Every pairing counts one virtual win and one virtual loss so sweeps still get
+finite ratings. The same seed gives the same games for any number of workers.
+
+    python3 tournament.py random heuristic h521=heuristic:weights=5,2,1 --workers 4
+"""
+import math
+import time
+import argparse
+from collections import namedtuple
+from itertools import combinations
+from multiprocessing import Pool, cpu_count
+
+from main import DEFAULT_AI_OPTIONS, parse_weights
+from simulate import AI_PLAYER_TYPES, _play_game, game_seeds
+
+Entrant = namedtuple("Entrant", ["name", "player_type", "options"])
+
+# 95% two-sided normal quantile
+Z95 = 1.959964
+ELO_PER_NAT = 400 / math.log(10)
+
+
+def parse_value(option, text):
+    if option == "weights":
+        return parse_weights(text)
+    if text.lower() == "none":
+        return None
+    for kind in (int, float):
+        try:
+            return kind(text)
+        except ValueError:
+            pass
+    return text
+
+
+def parse_entrant(spec):
+    """ An Entrant from "[name=]type[:option=value...]". """
+    head, *settings = spec.split(":")
+    name, _, player_type = head.rpartition("=")
+    if player_type not in AI_PLAYER_TYPES:
+        raise ValueError(f"{player_type} is not a computer player type")
+    options = {}
+    for setting in settings:
+        option, _, value = setting.partition("=")
+        if option not in DEFAULT_AI_OPTIONS or option in ("white", "blue"):
+            raise ValueError(f"{option} is not a player option")
+        options[option] = parse_value(option, value)
+    return Entrant(name or spec, player_type, options)
+
+
+def expected_score(elo):
+    """ Chance of winning a game for an Elo advantage of elo. """
+    return 1 / (1 + 10 ** (-elo / 400))
+
+
+def sprt_llr(wins, losses, elo0, elo1):
+    """ Log likelihood ratio of elo1 against elo0 for a win/loss record. """
+    p0, p1 = expected_score(elo0), expected_score(elo1)
+    return wins * math.log(p1 / p0) + losses * math.log((1 - p1) / (1 - p0))
+
+
+def sprt_bounds(alpha, beta):
+    """ (lower, upper) LLR bounds: below lower accept elo0, above upper accept elo1. """
+    return math.log(beta / (1 - alpha)), math.log((1 - beta) / alpha)
+
+
+def elo_interval(wins, losses):
+    """ Elo difference of a win/loss record and the half width of its 95%
+        interval, with one virtual win and loss added.
+    """
+    wins, losses = wins + 1, losses + 1
+    games = wins + losses
+    score = wins / games
+    elo = -400 * math.log10(1 / score - 1)
+    # delta method: d elo / d score = ELO_PER_NAT / (score * (1 - score))
+    margin = Z95 * math.sqrt(score * (1 - score) / games) * ELO_PER_NAT / (score * (1 - score))
+    return elo, margin
+
+
+def _invert(matrix):
+    """ Inverse of a small square matrix by Gauss-Jordan elimination. """
+    n = len(matrix)
+    rows = [list(row) + [1.0 if i == j else 0.0 for j in range(n)] for i, row in enumerate(matrix)]
+    for column in range(n):
+        pivot = max(range(column, n), key = lambda row: abs(rows[row][column]))
+        rows[column], rows[pivot] = rows[pivot], rows[column]
+        scale = rows[column][column]
+        rows[column] = [value / scale for value in rows[column]]
+        for row in range(n):
+            if row != column and rows[row][column]:
+                factor = rows[row][column]
+                rows[row] = [value - factor * pivot_value for value, pivot_value in zip(rows[row], rows[column])]
+    return [row[n:] for row in rows]
+
+
+def ratings(n_players, records, iterations = 1000):
+    """ Maximum likelihood Elo ratings and their 95% intervals.
+        Args:
+            n_players (int): Number of entrants.
+            records (dict): (i, j) to [wins of i, wins of j] for each pairing played.
+        Return:
+            (list) : (elo, margin) per entrant, centered on a mean of 0.
+    """
+    wins = [0.0] * n_players
+    games = {}
+    for (i, j), (won, lost) in records.items():
+        wins[i] += won + 1
+        wins[j] += lost + 1
+        games[(i, j)] = games[(j, i)] = won + lost + 2
+
+    # minorization-maximization (Hunter 2004) on strengths gamma = e**rating
+    gamma = [1.0] * n_players
+    for _ in range(iterations):
+        updated = []
+        for i in range(n_players):
+            denominator = sum(count / (gamma[i] + gamma[j]) for (a, j), count in games.items() if a == i)
+            updated.append(wins[i] / denominator if denominator else gamma[i])
+        scale = math.exp(sum(math.log(value) for value in updated) / n_players)
+        updated = [value / scale for value in updated]
+        done = max(abs(math.log(new / old)) for new, old in zip(updated, gamma)) < 1e-10
+        gamma = updated
+        if done:
+            break
+    nats = [math.log(value) for value in gamma]
+
+    # covariance with the first entrant pinned at 0, then moved to the centered ratings
+    information = [[0.0] * n_players for _ in range(n_players)]
+    for (i, j), count in games.items():
+        p = gamma[i] / (gamma[i] + gamma[j])
+        information[i][i] += count * p * (1 - p)
+        information[i][j] -= count * p * (1 - p)
+    if n_players < 2:
+        return [(0.0, 0.0)] * n_players
+    reduced = _invert([row[1:] for row in information[1:]])
+    pinned = [[0.0] * n_players] + [[0.0] + row for row in reduced]
+    means = [sum(row) / n_players for row in pinned]
+    total = sum(means) / n_players
+    variances = [pinned[i][i] - 2 * means[i] + total for i in range(n_players)]
+    mean = sum(nats) / n_players
+    return [((nats[i] - mean) * ELO_PER_NAT, Z95 * math.sqrt(max(variances[i], 0.0)) * ELO_PER_NAT) for i in range(n_players)]
+
+
+class Pairing():
+    def __init__(self, first, second, seeds):
+        """ Args:
+                first (int): Index of the entrant the results are counted for.
+                second (int): Index of its opponent.
+                seeds (list): A seed for every game the pairing may play.
+        """
+        self.first = first
+        self.second = second
+        self.seeds = seeds
+        self.wins = 0
+        self.losses = 0
+        self.verdict = None
+
+    @property
+    def games(self):
+        return self.wins + self.losses
+
+    def jobs(self, entrants, n_games):
+        """ The next n_games games as (first plays white, play_game arguments),
+            colors alternating with the game number.
+        """
+        jobs = []
+        for number in range(self.games, min(self.games + n_games, len(self.seeds))):
+            first_white = number % 2 == 0
+            white, blue = (self.first, self.second) if first_white else (self.second, self.first)
+            ai_options = {"white": entrants[white].options, "blue": entrants[blue].options}
+            jobs.append((first_white, (entrants[white].player_type, entrants[blue].player_type, self.seeds[number], ai_options)))
+        return jobs
+
+    def add(self, first_white, result):
+        if (result.winner == "white") == first_white:
+            self.wins += 1
+        else:
+            self.losses += 1
+
+
+def run_tournament(entrants, seed = 0, workers = 1, batch = 20, max_games = 400, elo_bound = 30.0, alpha = 0.05, beta = 0.05, log = None):
+    """ Plays a round-robin tournament.
+        Args:
+            entrants (list): Entrants, see parse_entrant.
+            seed (int): Master seed for every game.
+            workers (int): Number of processes, None for one per core. With more than
+                one, mcts entrants run with mcts_workers = 1.
+            batch (int): Games per pairing in each round.
+            max_games (int): Games after which an undecided pairing stops.
+            elo_bound (float): The SPRT tests +elo_bound against -elo_bound.
+            alpha (float): Chance of deciding for the first entrant when it is elo_bound weaker.
+            beta (float): Chance of deciding against it when it is elo_bound stronger.
+            log (function): Called with a line of progress after each round.
+        Return:
+            (dict) : "pairings" and "ratings", one dict per pairing and per entrant.
+    """
+    if workers is None:
+        workers = cpu_count()
+    if workers > 1:
+        # games run in daemonic pool processes, which cannot start mcts pools of their own
+        entrants = [entrant._replace(options = dict(entrant.options, mcts_workers = 1)) for entrant in entrants]
+    lower, upper = sprt_bounds(alpha, beta)
+    pairs = list(combinations(range(len(entrants)), 2))
+    pairings = [Pairing(first, second, game_seeds(pair_seed, max_games)) for (first, second), pair_seed in zip(pairs, game_seeds(seed, len(pairs)))]
+    pool = Pool(workers) if workers > 1 else None
+    start = time.perf_counter()
+    try:
+        active = list(pairings)
+        while active:
+            jobs = [(pairing, first_white, job) for pairing in active for first_white, job in pairing.jobs(entrants, batch)]
+            args = [job for _, _, job in jobs]
+            results = pool.map(_play_game, args) if pool is not None else list(map(_play_game, args))
+            for (pairing, first_white, _), result in zip(jobs, results):
+                pairing.add(first_white, result)
+            for pairing in active:
+                llr = sprt_llr(pairing.wins, pairing.losses, -elo_bound, elo_bound)
+                if llr >= upper:
+                    pairing.verdict = "stronger"
+                elif llr <= lower:
+                    pairing.verdict = "weaker"
+                elif pairing.games >= max_games:
+                    pairing.verdict = "undecided"
+            active = [pairing for pairing in active if pairing.verdict is None]
+            if log is not None:
+                log(f"{sum(pairing.games for pairing in pairings)} games, {len(active)} pairings running, {time.perf_counter() - start:.1f}s")
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    rated = ratings(len(entrants), {(pairing.first, pairing.second): (pairing.wins, pairing.losses) for pairing in pairings})
+    report = {"pairings": [], "ratings": [], "seconds": time.perf_counter() - start}
+    for pairing in pairings:
+        elo, margin = elo_interval(pairing.wins, pairing.losses)
+        report["pairings"].append({
+            "first": entrants[pairing.first].name,
+            "second": entrants[pairing.second].name,
+            "games": pairing.games,
+            "wins": pairing.wins,
+            "losses": pairing.losses,
+            "elo": elo,
+            "elo_margin": margin,
+            "verdict": pairing.verdict,
+        })
+    for index, entrant in enumerate(entrants):
+        played = [pairing for pairing in pairings if index in (pairing.first, pairing.second)]
+        won = sum(pairing.wins if pairing.first == index else pairing.losses for pairing in played)
+        games = sum(pairing.games for pairing in played)
+        report["ratings"].append({
+            "name": entrant.name,
+            "games": games,
+            "score": won / games if games else 0.0,
+            "elo": rated[index][0],
+            "elo_margin": rated[index][1],
+        })
+    report["ratings"].sort(key = lambda row: row["elo"], reverse = True)
+    return report
+
+
+def print_report(report):
+    print(f"{'pairing':<36} {'games':>6} {'w-l':>9} {'elo':>16}  sprt")
+    for row in report["pairings"]:
+        print(f"{row['first'] + ' vs ' + row['second']:<36} {row['games']:>6} {str(row['wins']) + '-' + str(row['losses']):>9} {row['elo']:>+7.0f} +/- {row['elo_margin']:<5.0f}  {row['verdict']}")
+    print()
+    print(f"{'rank':<5} {'entrant':<24} {'games':>6} {'score':>7} {'elo':>16}")
+    for rank, row in enumerate(report["ratings"], 1):
+        print(f"{rank:<5} {row['name']:<24} {row['games']:>6} {row['score']:>7.1%} {row['elo']:>+7.0f} +/- {row['elo_margin']:<5.0f}")
+    print(f"\n{report['seconds']:.1f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Run a round-robin Elo tournament between Santorini computer players', prog = 'tournament.py')
+    parser.add_argument('entrants', nargs = '+', type = str, help='entrants as [name=]type[:option=value...], ie: h521=heuristic:weights=5,2,1')
+    parser.add_argument('--batch', type = int, default = 20, help='games per pairing between SPRT checks')
+    parser.add_argument('--max-games', type = int, default = 400, help='games after which an undecided pairing stops')
+    parser.add_argument('--elo-bound', type = float, default = 30.0, help='SPRT tests an Elo difference of +bound against -bound')
+    parser.add_argument('--alpha', type = float, default = 0.05, help='SPRT false positive rate')
+    parser.add_argument('--beta', type = float, default = 0.05, help='SPRT false negative rate')
+    parser.add_argument('--seed', type = int, default = 0, help='master seed for the games')
+    parser.add_argument('--workers', type = int, default = 1, help='number of processes (0 for one per core)')
+    args = parser.parse_args()
+
+    entrants = [parse_entrant(spec) for spec in args.entrants]
+    if len({entrant.name for entrant in entrants}) != len(entrants):
+        parser.error("entrant names must be unique")
+    report = run_tournament(entrants, args.seed, args.workers or None, args.batch, args.max_games, args.elo_bound, args.alpha, args.beta, log = print)
+    print()
+    print_report(report)
@@ -0,0 +1,148 @@
+""" Fits a learned evaluator (see learned.py) to self-play positions on the CPU.
+
+Takes dataset files (dataset.py), directories of shards, or binary game
+record files (records.py, ending in .rec). Every finished game's positions
+are used: the features are taken from the side that has just moved and the
+target is its outcome. The linear model is fitted in closed form by ridge
+regression, the MLP by minibatch Adam on the squared error. A held-out split
+is scored at the end.
+
+    python3 dataset.py generate heuristic heuristic --games 5000 --shards 4 --out data
+    python3 train_evaluator.py data --model mlp --out eval.npz
+    python3 main.py heuristic random --evaluator eval.npz
+"""
+import os
+import time
+import argparse
+
+import numpy as np
+
+from dataset import POSITION_DTYPE, game_positions, load, load_shards
+from learned import N_FEATURES, LinearEvaluator, MLPEvaluator, features, save_model
+from records import read_records
+
+
+def load_positions(paths):
+    """ One POSITION_DTYPE array of every position in paths. """
+    arrays = []
+    for path in paths:
+        if os.path.isdir(path):
+            arrays.extend(load_shards(path))
+        elif path.endswith(".rec"):
+            arrays.extend(game_positions(record) for record in read_records(path))
+        else:
+            arrays.append(load(path))
+    if not arrays:
+        return np.zeros(0, dtype = POSITION_DTYPE)
+    return np.concatenate(arrays)
+
+
+def training_set(positions):
+    """ Features and targets of the positions of finished games.
+        Return:
+            (tuple) : (N, N_FEATURES) features and (N,) outcomes for the side that has just moved.
+    """
+    positions = positions[positions["outcome"] != 0]
+    side = positions["side"].astype(np.int64)
+    x = features(positions["heights"], positions["workers"], 1 - side)
+    y = -positions["outcome"].astype(np.float64)
+    return x, y
+
+
+def fit_linear(x, y, l2 = 1e-3):
+    """ Ridge regression, with the bias left unregularized. """
+    design = np.hstack([x, np.ones((len(x), 1))])
+    penalty = l2 * len(x) * np.eye(design.shape[1])
+    penalty[-1, -1] = 0
+    solution = np.linalg.solve(design.T @ design + penalty, design.T @ y)
+    return LinearEvaluator(solution[:-1], solution[-1])
+
+
+def fit_mlp(x, y, hidden = 32, epochs = 20, batch = 256, lr = 1e-3, l2 = 1e-4, seed = 0, log = None):
+    """ One ReLU hidden layer and a tanh output, trained by Adam on the squared error. """
+    rng = np.random.default_rng(seed)
+    params = [
+        rng.normal(0, np.sqrt(2 / N_FEATURES), (N_FEATURES, hidden)),
+        np.zeros(hidden),
+        rng.normal(0, np.sqrt(1 / hidden), hidden),
+        np.zeros(()),
+    ]
+    first = [np.zeros_like(param) for param in params]
+    second = [np.zeros_like(param) for param in params]
+    beta1, beta2, eps = 0.9, 0.999, 1e-8
+    step = 0
+    for epoch in range(epochs):
+        order = rng.permutation(len(x))
+        total = 0.0
+        for begin in range(0, len(x), batch):
+            rows = order[begin:begin + batch]
+            xb, yb = x[rows], y[rows]
+            w1, b1, w2, b2 = params
+            pre = xb @ w1 + b1
+            hid = np.maximum(pre, 0)
+            out = np.tanh(hid @ w2 + b2)
+            error = out - yb
+            total += float(error @ error)
+
+            d_out = 2 * error * (1 - out * out) / len(rows)
+            d_hid = np.outer(d_out, w2) * (pre > 0)
+            grads = [xb.T @ d_hid + l2 * w1, d_hid.sum(axis = 0), hid.T @ d_out + l2 * w2, d_out.sum()]
+
+            step += 1
+            for index, grad in enumerate(grads):
+                first[index] = beta1 * first[index] + (1 - beta1) * grad
+                second[index] = beta2 * second[index] + (1 - beta2) * grad * grad
+                corrected = first[index] / (1 - beta1 ** step)
+                params[index] = params[index] - lr * corrected / (np.sqrt(second[index] / (1 - beta2 ** step)) + eps)
+        if log is not None:
+            log(f"epoch {epoch + 1}: mse {total / len(x):.4f}")
+    return MLPEvaluator(*params)
+
+
+def score(model, x, y):
+    """ Mean squared error and how often the predicted winner is right. """
+    predicted = model.predict(x)
+    return {"mse": float(np.mean((predicted - y) ** 2)), "accuracy": float(np.mean(np.sign(predicted) == y))}
+
+
+def train(paths, model = "linear", holdout = 0.1, seed = 0, log = None, **options):
+    """ Fits a model to the positions in paths.
+        Return:
+            (tuple) : The LearnedEvaluator and its score on the held-out positions.
+    """
+    x, y = training_set(load_positions(paths))
+    if len(x) == 0:
+        raise ValueError("no positions from finished games to train on")
+    order = np.random.default_rng(seed).permutation(len(x))
+    split = int(len(x) * (1 - holdout))
+    train_rows, test_rows = order[:split], order[split:]
+    if model == "linear":
+        fitted = fit_linear(x[train_rows], y[train_rows], options.get("l2", 1e-3))
+    else:
+        fitted = fit_mlp(x[train_rows], y[train_rows], seed = seed, log = log, **options)
+    return fitted, score(fitted, x[test_rows], y[test_rows]) if len(test_rows) else None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Fit a learned Santorini evaluator to self-play positions', prog = 'train_evaluator.py')
+    parser.add_argument('paths', nargs = '+', type = str, help='dataset files, shard directories or .rec game record files')
+    parser.add_argument('--model', type = str, default = 'linear', help='model to fit', choices = ['linear', 'mlp'])
+    parser.add_argument('--out', type = str, default = 'eval.npz', help='model file to write')
+    parser.add_argument('--hidden', type = int, default = 32, help='hidden units of the mlp')
+    parser.add_argument('--epochs', type = int, default = 20, help='passes over the data for the mlp')
+    parser.add_argument('--batch', type = int, default = 256, help='minibatch size for the mlp')
+    parser.add_argument('--lr', type = float, default = 1e-3, help='Adam learning rate for the mlp')
+    parser.add_argument('--l2', type = float, default = None, help='weight penalty (default: 1e-3 linear, 1e-4 mlp)')
+    parser.add_argument('--holdout', type = float, default = 0.1, help='fraction of positions held out for scoring')
+    parser.add_argument('--seed', type = int, default = 0, help='seed for the split and the mlp')
+    args = parser.parse_args()
+
+    options = {} if args.l2 is None else {"l2": args.l2}
+    if args.model == 'mlp':
+        options.update(hidden = args.hidden, epochs = args.epochs, batch = args.batch, lr = args.lr)
+    start = time.perf_counter()
+    model, held_out = train(args.paths, args.model, args.holdout, args.seed, log = print, **options)
+    save_model(model, args.out)
+    print(f"{model.describe()} written to {args.out} in {time.perf_counter() - start:.1f}s")
+    if held_out is not None:
+        print(f"held out: mse {held_out['mse']:.4f}, winner right {held_out['accuracy']:.1%}")
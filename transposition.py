@@ -0,0 +1,85 @@
+""" Fixed-size transposition table keyed by Zobrist hash.
+
+Entries are packed into two unsigned 64-bit arrays (key and data), so the
+table's memory is fixed when it is created: 16 bytes per entry, a power of two
+entries that fit in the requested number of megabytes.
+
+Data word layout, low bits first:
+    13 bits  move code (0 = no move)
+     2 bits  bound flag
+     7 bits  depth
+     8 bits  generation (the search that stored it)
+    23 bits  score + SCORE_OFFSET
+"""
+from array import array
+
+from engine import CELLS, Move
+
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+ENTRY_BYTES = 16
+SCORE_OFFSET = 1 << 22
+MAX_TABLE_DEPTH = 127
+
+
+def encode_move(move):
+    if move is None:
+        return 0
+    return 1 + (move.worker * CELLS + move.end) * CELLS + move.build
+
+
+def decode_move(code, state):
+    """ The start cell is not stored; it is where the worker stands in state. """
+    if code == 0:
+        return None
+    code -= 1
+    code, build = divmod(code, CELLS)
+    worker, end = divmod(code, CELLS)
+    return Move(worker, state.workers[worker], end, build)
+
+
+class TranspositionTable():
+    def __init__(self, megabytes = 16):
+        entries = 1
+        while entries * 2 * ENTRY_BYTES <= megabytes * 1024 * 1024:
+            entries *= 2
+        self.size = entries
+        self.mask = entries - 1
+        self.keys = array("Q", bytes(8 * entries))
+        self.data = array("Q", bytes(8 * entries))
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def new_search(self):
+        """ Marks entries stored from now on as newer than everything already in the table. """
+        self.generation = (self.generation + 1) & 0xFF
+
+    def probe(self, key):
+        """ Returns (depth, score, flag, move code) stored for key, or None. """
+        slot = key & self.mask
+        if self.keys[slot] != key or self.data[slot] == 0:
+            self.misses += 1
+            return None
+        self.hits += 1
+        data = self.data[slot]
+        return ((data >> 15) & 0x7F, (data >> 30) - SCORE_OFFSET, (data >> 13) & 0x3, data & 0x1FFF)
+
+    def store(self, key, depth, score, flag, move = None):
+        """ Stores an entry unless the slot holds a deeper result for another
+            position from the current search.
+        """
+        slot = key & self.mask
+        old = self.data[slot]
+        if old and self.keys[slot] != key:
+            if (old >> 22) & 0xFF == self.generation and (old >> 15) & 0x7F > depth:
+                return
+        code = encode_move(move)
+        if code == 0 and old and self.keys[slot] == key:
+            # keep the best move found by an earlier search of this position
+            code = old & 0x1FFF
+        depth = min(depth, MAX_TABLE_DEPTH)
+        self.keys[slot] = key
+        self.data[slot] = ((score + SCORE_OFFSET) << 30) | (self.generation << 22) | (depth << 15) | (flag << 13) | code